@@ -1 +1,3 @@
-from .db import Base, engine, SessionLocal,get_db
\ No newline at end of file
+from .db import Base, engine, SessionLocal,async_engine,AsyncSessionLocal
+from .session import get_db,get_async_db,job_session,session_scope,identity_map_stats
+from .migrations import apply_migrations
\ No newline at end of file
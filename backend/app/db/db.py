@@ -1,9 +1,22 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy_utils import create_database, database_exists
 from app.lib import DATABASE_URL
+from app.lib.constants import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_STATEMENT_TIMEOUT_MS
 
-engine = create_engine(DATABASE_URL)
+POOL_OPTIONS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+)
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+    **POOL_OPTIONS,
+)
 
 if not database_exists(DATABASE_URL):
     create_database(DATABASE_URL)
@@ -12,9 +25,23 @@ Base = declarative_base()
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+def async_database_url(url: str):
+    """DB_URL with the asyncpg driver. libpq's sslmode isn't understood by asyncpg, it is passed as ssl instead."""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    connect_args = {}
+    if "sslmode" in url.query:
+        connect_args["ssl"] = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"])
+    return url, connect_args
+
+_async_url, _async_connect_args = async_database_url(DATABASE_URL)
+
+# used by the async routes, nothing connects until the first request
+async_engine = create_async_engine(
+    _async_url,
+    connect_args={**_async_connect_args, "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}},
+    **POOL_OPTIONS,
+)
+
+# expire_on_commit=False: attributes of committed objects can't be lazy loaded again in async code
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
\ No newline at end of file
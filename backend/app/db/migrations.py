@@ -0,0 +1,14 @@
+from sqlalchemy import text
+
+# create_all() only creates missing tables, columns added to an existing model need a statement
+# here. Every statement must be safe to run on each startup.
+MIGRATIONS = [
+    # ReportsMedia.content_hash, used to link re-uploaded files to the media already stored
+    "ALTER TABLE reports_media ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_reports_media_content_hash ON reports_media (content_hash)",
+]
+
+def apply_migrations(engine):
+    with engine.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Session scopes. Every request and every job gets its own Session (and so its own pooled
+connection and identity map), which is rolled back on error and closed when the scope ends.
+
+    def route(db: Session = Depends(get_db)): ...              # sync request scope
+    async def route(db: AsyncSession = Depends(get_async_db)): ...
+    with job_session("ocr") as db: ...                          # RQ jobs, schedulers, scripts
+
+When a scope closes, the number of objects its identity map held is recorded per scope name
+(see identity_map_stats), so a scope that loads far more rows than it needs shows up.
+"""
+import threading
+from contextlib import contextmanager
+from app.db.db import SessionLocal, AsyncSessionLocal
+from app.lib.constants import DB_IDENTITY_MAP_WARN
+from app.lib.create_logging import get_logger
+
+logger = get_logger("db_session", "db_session.log")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def record_identity_map(scope: str, size: int):
+    with _stats_lock:
+        stats = _stats.setdefault(scope, {"sessions": 0, "objects": 0, "max": 0, "last": 0})
+        stats["sessions"] += 1
+        stats["objects"] += size
+        stats["max"] = max(stats["max"], size)
+        stats["last"] = size
+    if size >= DB_IDENTITY_MAP_WARN:
+        logger.warning(f"{scope} session closed with {size} objects in its identity map")
+
+def identity_map_stats():
+    """Per scope: sessions closed, average/max/last identity map size. Counts are per process."""
+    with _stats_lock:
+        return {
+            scope: {
+                "sessions": stats["sessions"],
+                "avg": round(stats["objects"] / stats["sessions"], 2) if stats["sessions"] else 0,
+                "max": stats["max"],
+                "last": stats["last"],
+            }
+            for scope, stats in _stats.items()
+        }
+
+@contextmanager
+def session_scope(scope: str):
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        record_identity_map(scope, len(db.identity_map))
+        db.close()
+
+def job_session(name: str):
+    """Session for one RQ job (or one scheduler run), never shared with another job."""
+    return session_scope(f"job:{name}")
+
+def get_db():
+    with session_scope("request") as db:
+        yield db
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            record_identity_map("request:async", len(db.sync_session.identity_map))
\ No newline at end of file
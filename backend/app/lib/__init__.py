@@ -1,8 +1,30 @@
 from .constants import DATABASE_URL, BASE_URL,UPLOADS_DIR, REDIS_PORT, REDIS_HOST,EMAIL,PASSWORD,CLIENT_URL,SECRET
-from .redis import r_queue,raw_data_vectorization,email_worker
-from .llm import llm
-from .qdrant import qdrant,dense_embedder,sparse_embedder,client
+from .redis import r_queue,ocr_queue,extract_queue,persist_queue,raw_data_vectorization,email_worker
+from .llm import llm,LLM_MODEL
 from .prompt import get_extraction_prompt,get_query_prompt,summarization_prompt
 from .email_template import account_verification_email,forgot_password_email
 from .jwt import JWT
-from .create_logging import get_logger
\ No newline at end of file
+from .create_logging import get_logger
+from .auth_cache import auth_cache
+
+# importing these pulls in qdrant_client (and with it fastembed/onnxruntime) or numpy, so they
+# are only loaded when first asked for
+_LAZY = {
+    "get_qdrant": "qdrant",
+    "get_qdrant_client": "qdrant",
+    "get_async_qdrant_client": "qdrant",
+    "get_dense_embedder": "qdrant",
+    "get_sparse_embedder": "qdrant",
+    "query_encoder": "query_encoder",
+    "answer_cache": "answer_cache",
+}
+
+def __getattr__(name):
+    # qdrant, client, dense_embedder and sparse_embedder are created on first use, see app.lib.qdrant
+    if name in ("qdrant", "client", "dense_embedder", "sparse_embedder"):
+        from . import qdrant as qdrant_module
+        return getattr(qdrant_module, name)
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(f"{__name__}.{_LAZY[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
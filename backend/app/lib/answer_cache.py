@@ -0,0 +1,119 @@
+import json
+import re
+import time
+import numpy as np
+from redis.exceptions import RedisError
+from app.lib.redis import r
+from app.lib.query_encoder import query_encoder
+from app.lib.constants import ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_PER_REPORT, ANSWER_CACHE_TTL
+from app.lib.create_logging import get_logger
+
+logger = get_logger("answer_cache", "answer_cache.log")
+
+def replay_tokens(answer: str):
+    """Splits a cached answer back into word sized tokens so it can be streamed like a live one."""
+    return re.findall(r"\S+\s*|\s+", answer)
+
+class SemanticAnswerCache:
+    """
+    Per report and user cache of answered questions.
+    A question is answered from the cache when a previous question of the same user about the
+    same report has a dense embedding with cosine similarity >= `threshold`.
+    Each (report, user) keeps its `max_entries` most recent answers in a Redis list, and every
+    report tracks the users it has lists for so invalidate() can drop all of them.
+    """
+    prefix = "answer_cache"
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, max_entries: int = ANSWER_CACHE_MAX_PER_REPORT, ttl: int = ANSWER_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+
+    def _key(self, report_id, user_id):
+        return f"{self.prefix}:report:{report_id}:user:{user_id}"
+
+    def _users_key(self, report_id):
+        return f"{self.prefix}:report:{report_id}:users"
+
+    def embed(self, question: str):
+        # shares the query encoder's LRU, so the search that follows a miss doesn't embed again
+        vector = np.asarray(query_encoder.encode(question).dense, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, report_id, user_id, question: str, vector=None):
+        """Returns (answer, similarity, vector) for the closest cached question, answer is None on a miss."""
+        vector = self.embed(question) if vector is None else vector
+        try:
+            entries = [json.loads(raw) for raw in r.lrange(self._key(report_id, user_id), 0, -1)]
+        except RedisError as e:
+            logger.warning(f"Answer cache unavailable: {e}")
+            return None, 0.0, vector
+
+        best, best_score = None, 0.0
+        if entries:
+            scores = np.asarray([entry["vector"] for entry in entries], dtype=np.float32) @ vector
+            idx = int(np.argmax(scores))
+            best, best_score = entries[idx], float(scores[idx])
+
+        try:
+            if best is not None and best_score >= self.threshold:
+                pipe = r.pipeline()
+                pipe.incr(f"{self.prefix}:hits")
+                pipe.incrbyfloat(f"{self.prefix}:saved_ms", best.get("latency_ms", 0))
+                pipe.execute()
+                return best["answer"], best_score, vector
+            r.incr(f"{self.prefix}:misses")
+        except RedisError:
+            pass
+        return None, best_score, vector
+
+    def store(self, report_id, user_id, question: str, answer: str, latency_ms: float, vector=None):
+        if not answer:
+            return
+        vector = self.embed(question) if vector is None else vector
+        entry = {
+            "question": question,
+            "vector": [round(float(v), 6) for v in vector],
+            "answer": answer,
+            "latency_ms": latency_ms,
+            "created": time.time(),
+        }
+        key = self._key(report_id, user_id)
+        try:
+            pipe = r.pipeline()
+            pipe.lpush(key, json.dumps(entry))
+            pipe.ltrim(key, 0, self.max_entries - 1)
+            pipe.expire(key, self.ttl)
+            pipe.sadd(self._users_key(report_id), str(user_id))
+            pipe.expire(self._users_key(report_id), self.ttl)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not cache answer for report {report_id}: {e}")
+
+    def invalidate(self, report_ids):
+        """Drops cached answers, call it whenever a report is re-extracted or deleted."""
+        if not isinstance(report_ids, (list, tuple, set)):
+            report_ids = [report_ids]
+        if not report_ids:
+            return
+        try:
+            keys = []
+            for report_id in report_ids:
+                keys += [self._key(report_id, user_id) for user_id in r.smembers(self._users_key(report_id))]
+                keys.append(self._users_key(report_id))
+            r.delete(*keys)
+        except RedisError as e:
+            logger.warning(f"Could not invalidate answer cache for reports {report_ids}: {e}")
+
+    def stats(self):
+        hits = int(r.get(f"{self.prefix}:hits") or 0)
+        misses = int(r.get(f"{self.prefix}:misses") or 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "saved_llm_ms": float(r.get(f"{self.prefix}:saved_ms") or 0),
+        }
+
+answer_cache = SemanticAnswerCache()
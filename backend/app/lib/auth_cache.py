@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+from app.lib.redis import r
+from app.lib.constants import AUTH_CACHE_TTL, AUTH_CACHE_LOCAL_TTL, AUTH_CACHE_LOCAL_MAX
+from app.lib.create_logging import get_logger
+
+logger = get_logger("auth_cache", "auth_cache.log")
+
+def token_fingerprint(token: str):
+    # raw tokens are never used as keys, a Redis dump must not hand out sessions
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class AuthPrincipalCache:
+    """
+    Caches the principal get_current_user builds from the users table, keyed by the
+    fingerprint of the access token.
+    Lookups go to a small in-process LRU first (entries live `local_ttl` seconds), then to
+    Redis (`ttl` seconds, never past the token's own expiry). Every user's fingerprints are
+    tracked in a Redis set so all of them can be dropped when the user signs out, changes
+    password or gets verified. Other processes may serve their local copy for up to
+    `local_ttl` seconds after that.
+    """
+    prefix = "auth_cache"
+
+    def __init__(self, ttl: int = AUTH_CACHE_TTL, local_ttl: int = AUTH_CACHE_LOCAL_TTL, max_local: int = AUTH_CACHE_LOCAL_MAX):
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_local = max(1, int(max_local))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _token_key(self, fingerprint: str):
+        return f"{self.prefix}:token:{fingerprint}"
+
+    def _user_key(self, email: str):
+        return f"{self.prefix}:user:{email}"
+
+    def _remember_local(self, fingerprint: str, principal: dict):
+        with self._lock:
+            self._local[fingerprint] = (time.monotonic() + self.local_ttl, principal)
+            self._local.move_to_end(fingerprint)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def get(self, token: str):
+        fingerprint = token_fingerprint(token)
+        with self._lock:
+            entry = self._local.get(fingerprint)
+            if entry is not None:
+                expires, principal = entry
+                if expires > time.monotonic():
+                    self._local.move_to_end(fingerprint)
+                    self.local_hits += 1
+                    return principal
+                del self._local[fingerprint]
+
+        try:
+            raw = r.get(self._token_key(fingerprint))
+        except RedisError as e:
+            logger.warning(f"Auth cache unavailable: {e}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+
+        principal = json.loads(raw)
+        self.redis_hits += 1
+        self._remember_local(fingerprint, principal)
+        return principal
+
+    def set(self, token: str, principal: dict, expires_at: float = None):
+        fingerprint = token_fingerprint(token)
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, int(expires_at - time.time()))
+        if ttl <= 0:
+            return
+        self._remember_local(fingerprint, principal)
+        try:
+            pipe = r.pipeline()
+            pipe.set(self._token_key(fingerprint), json.dumps(principal), ex=ttl)
+            pipe.sadd(self._user_key(principal["email"]), fingerprint)
+            pipe.expire(self._user_key(principal["email"]), self.ttl)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not cache principal: {e}")
+
+    def invalidate_user(self, email: str):
+        """Drops every cached principal of `email`, locally and in Redis."""
+        with self._lock:
+            for fingerprint in [fp for fp, (_, p) in self._local.items() if p.get("email") == email]:
+                del self._local[fingerprint]
+        try:
+            fingerprints = r.smembers(self._user_key(email))
+            keys = [self._token_key(fp) for fp in fingerprints] + [self._user_key(email)]
+            r.delete(*keys)
+        except RedisError as e:
+            logger.warning(f"Could not invalidate cached principals of {email}: {e}")
+
+    def stats(self):
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_size": len(self._local),
+        }
+
+auth_cache = AuthPrincipalCache()
@@ -15,4 +15,103 @@ os.environ['GROQ_API_KEY'] = os.getenv('GROQ_API_KEY')
 EMAIL=os.getenv("EMAIL")
 PASSWORD=os.getenv("PASSWORD")
 CLIENT_URL=os.getenv("CLIENT_URL")
-SECRET=os.getenv("SECRET")
\ No newline at end of file
+SECRET=os.getenv("SECRET")
+
+# OCR engine pool
+OCR_POOL_SIZE=int(os.getenv("OCR_POOL_SIZE", "1"))
+OCR_LANG=os.getenv("OCR_LANG", "en")
+OCR_VERSION=os.getenv("OCR_VERSION", "PP-OCRv3")
+OCR_USE_ANGLE_CLS=os.getenv("OCR_USE_ANGLE_CLS", "false").lower() == "true"
+OCR_WARM_UP_ON_START=os.getenv("OCR_WARM_UP_ON_START", "true").lower() == "true"
+OCR_BATCH_SIZE=int(os.getenv("OCR_BATCH_SIZE", "10"))
+OCR_IN_MEMORY=os.getenv("OCR_IN_MEMORY", "true").lower() == "true"
+OCR_DEBUG_DUMP=os.getenv("OCR_DEBUG_DUMP", "false").lower() == "true"
+# auto | skip | fast | full
+OCR_PREPROCESS_PROFILE=os.getenv("OCR_PREPROCESS_PROFILE", "auto").lower()
+OCR_NOISE_SKIP_BELOW=float(os.getenv("OCR_NOISE_SKIP_BELOW", "2.0"))
+OCR_NOISE_FAST_BELOW=float(os.getenv("OCR_NOISE_FAST_BELOW", "5.0"))
+# Laplacian variance below which a page counts as blurry, auto never skips denoising for those
+OCR_BLUR_BELOW=float(os.getenv("OCR_BLUR_BELOW", "100.0"))
+
+# OCR result cache, bump OCR_CACHE_VERSION to drop every cached page
+OCR_CACHE_ENABLED=os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_VERSION=os.getenv("OCR_CACHE_VERSION", "1")
+OCR_CACHE_MAX_ENTRIES=int(os.getenv("OCR_CACHE_MAX_ENTRIES", "10000"))
+OCR_CACHE_DIR=os.getenv("OCR_CACHE_DIR", "public/ocr_cache")
+
+# Structured extraction cache, bump EXTRACTION_CACHE_VERSION to drop every cached result
+EXTRACTION_CACHE_ENABLED=os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_VERSION=os.getenv("EXTRACTION_CACHE_VERSION", "1")
+EXTRACTION_CACHE_TTL=int(os.getenv("EXTRACTION_CACHE_TTL", str(60 * 60 * 24 * 30)))
+EXTRACTION_CACHE_MAX_ENTRIES=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "5000"))
+
+# Embedding
+EMBED_BATCH_SIZE=int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# onnxruntime threads per embedding model, unset lets onnxruntime decide (the prefork launcher sets 1)
+EMBED_THREADS=int(os.getenv("EMBED_THREADS")) if os.getenv("EMBED_THREADS") else None
+
+# Qdrant
+QDRANT_UPSERT_BATCH_SIZE=int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+QDRANT_UPSERT_WAIT=os.getenv("QDRANT_UPSERT_WAIT", "true").lower() == "true"
+QDRANT_UPSERT_PARALLEL=int(os.getenv("QDRANT_UPSERT_PARALLEL", "1"))
+# store the serialized row in each point's payload so /report/search needs no DB lookups
+QDRANT_STORE_ROW_PAYLOAD=os.getenv("QDRANT_STORE_ROW_PAYLOAD", "false").lower() == "true"
+# per-user HNSW graphs + user_id tenant index, run `python -m app.lib.qdrant_schema --tenant --backfill-user-ids` first
+QDRANT_TENANT_MODE=os.getenv("QDRANT_TENANT_MODE", "false").lower() == "true"
+# dense vector quantization: none | scalar (int8) | binary, applied when a collection is created
+# (`python -m app.lib.qdrant_schema --recreate` rebuilds existing ones)
+QDRANT_QUANTIZATION=os.getenv("QDRANT_QUANTIZATION", "none").lower()
+QDRANT_QUANTIZATION_RESCORE=os.getenv("QDRANT_QUANTIZATION_RESCORE", "true").lower() == "true"
+QDRANT_QUANTIZATION_OVERSAMPLING=float(os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", "2.0"))
+# keep original vectors and the HNSW graph on disk (only the quantized vectors stay in RAM)
+QDRANT_ON_DISK=os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+
+# Semantic answer cache for /report/search
+ANSWER_CACHE_ENABLED=os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_MAX_PER_REPORT=int(os.getenv("ANSWER_CACHE_MAX_PER_REPORT", "50"))
+ANSWER_CACHE_TTL=int(os.getenv("ANSWER_CACHE_TTL", str(60 * 60 * 24 * 7)))
+QUERY_CACHE_SIZE=int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+# Report claim scheduler
+REPORT_CLAIM_BATCH_SIZE=int(os.getenv("REPORT_CLAIM_BATCH_SIZE", "10"))
+REPORT_NOTIFY_CHANNEL=os.getenv("REPORT_NOTIFY_CHANNEL", "report_uploaded")
+# claim even without a NOTIFY this often, picks up reports uploaded while no scheduler was listening
+REPORT_CLAIM_POLL_SECONDS=float(os.getenv("REPORT_CLAIM_POLL_SECONDS", "30"))
+
+# Report jobs (one RQ job per report)
+REPORT_JOB_RETRIES=int(os.getenv("REPORT_JOB_RETRIES", "3"))
+# seconds to wait before each retry, the last value is reused for any further retries
+REPORT_JOB_RETRY_INTERVALS=[int(i) for i in os.getenv("REPORT_JOB_RETRY_INTERVALS", "10,60,300").split(",")]
+REPORT_JOB_TIMEOUT=int(os.getenv("REPORT_JOB_TIMEOUT", "900"))
+# how long a stage's output waits in Redis for the next stage
+REPORT_STAGE_TTL=int(os.getenv("REPORT_STAGE_TTL", str(60 * 60 * 24)))
+
+# Database connection pool (sync and async engines each get their own pool of this size)
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_PRE_PING=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# log a warning when a request/job session closes holding this many objects
+DB_IDENTITY_MAP_WARN=int(os.getenv("DB_IDENTITY_MAP_WARN", "5000"))
+
+# Auth principal cache (get_current_user), the TTLs are seconds
+AUTH_CACHE_ENABLED=os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_CACHE_TTL=int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_LOCAL_TTL=int(os.getenv("AUTH_CACHE_LOCAL_TTL", "10"))
+AUTH_CACHE_LOCAL_MAX=int(os.getenv("AUTH_CACHE_LOCAL_MAX", "10000"))
+
+# Password hashing pool (bcrypt runs in separate processes) and auth rate limits
+PASSWORD_HASH_WORKERS=int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# running + queued hash/verify calls allowed before answering 503
+PASSWORD_HASH_MAX_PENDING=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_TIMEOUT=float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+AUTH_RATE_LIMIT_WINDOW=int(os.getenv("AUTH_RATE_LIMIT_WINDOW", "60"))
+AUTH_RATE_LIMIT_PER_IP=int(os.getenv("AUTH_RATE_LIMIT_PER_IP", "30"))
+AUTH_RATE_LIMIT_PER_EMAIL=int(os.getenv("AUTH_RATE_LIMIT_PER_EMAIL", "10"))
+
+# Report uploads
+UPLOAD_CHUNK_SIZE=int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_FILE_BYTES=int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES=int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(100 * 1024 * 1024)))
\ No newline at end of file
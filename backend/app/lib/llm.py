@@ -1,7 +1,9 @@
 from langchain_groq import ChatGroq
 
+LLM_MODEL = "llama-3.3-70b-versatile"
+
 llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
+    model=LLM_MODEL,
     temperature=0,
     max_tokens=None,
     timeout=None,
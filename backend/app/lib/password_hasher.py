@@ -0,0 +1,123 @@
+import multiprocessing
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from app.workers import password_hashing
+from app.lib.constants import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT
+from app.lib.create_logging import get_logger
+
+logger = get_logger("password_hasher", "password_hasher.log")
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already queued, callers should answer 503."""
+
+@contextmanager
+def _placeholder_main():
+    """
+    Spawned children first re-run the parent's __main__ (main.py as __mp_main__, i.e. the whole
+    API with its table creation) before taking work. PasswordHasher.start() spawns the workers
+    while __main__ is an empty module, so they only import app.workers.password_hashing. Only
+    safe while nothing else runs in the process, i.e. at app startup.
+    """
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a pool of `workers` processes so it never competes with request handling
+    for the API process' CPU/GIL. At most `max_pending` calls may be running or queued at a
+    time; beyond that PasswordHasherBusy is raised right away instead of letting a login burst
+    pile up behind the pool. start() is called from the app's lifespan; without it the pool is
+    started on first use.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING, timeout: float = PASSWORD_HASH_TIMEOUT):
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(self.workers, int(max_pending)))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        # spawn: forking the threaded API process could copy a held lock into the children
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        """Starts every worker up front so no request pays for spawning one."""
+        pids = set()
+        # workers are spawned inside submit(), one per call while none is idle, so the pings
+        # are kept busy for a moment and resent until every worker has answered one
+        for _ in range(5):
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._new_executor()
+                with _placeholder_main():
+                    futures = [self._executor.submit(password_hashing.ping, 0.2) for _ in range(self.workers)]
+            pids.update(future.result() for future in futures)
+            if len(pids) >= self.workers:
+                break
+        logger.info(f"Password hashing pool started with {len(pids)} workers")
+
+    def _discard(self, executor):
+        """
+        Drops a pool whose worker died (a broken pool refuses all further work) so the next
+        call builds a fresh one. Its workers are spawned from the request path, so unlike the
+        ones from start() they re-import main.py once before taking work.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            executor = self._executor
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenProcessPool:
+            logger.error("Password hashing pool is broken, replacing it")
+            self._discard(executor)
+            raise PasswordHasherBusy("Password hashing pool is restarting")
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password operations in progress")
+        try:
+            executor, future = self._submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # the slot is held until the pool is done with the call, even if the caller gave up on it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            logger.warning(f"{func.__name__} took longer than {self.timeout}s")
+            raise PasswordHasherBusy("Password operation timed out")
+        except BrokenProcessPool:
+            logger.error(f"A password hashing worker died during {func.__name__}, replacing the pool")
+            self._discard(executor)
+            raise PasswordHasherBusy("Password hashing pool is restarting")
+
+    def hash(self, password: str):
+        return self._run(password_hashing.hash_password, password)
+
+    def verify(self, password: str, hashed: str):
+        return self._run(password_hashing.verify_password, password, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_hasher = PasswordHasher()
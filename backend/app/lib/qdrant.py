@@ -1,115 +1,149 @@
-from qdrant_client import QdrantClient
-from app.lib.constants import QDRANT_COLLECTION_1,QDRANT_COLLECTION_2,QDRANT_HOST,QDRANT_PORT
-from qdrant_client.models import Distance, VectorParams,models
-from fastembed import TextEmbedding
-from fastembed import SparseTextEmbedding
-from qdrant_client import models
-from qdrant_client.models import PointStruct
+from app.lib.constants import QDRANT_COLLECTION_1,QDRANT_TENANT_MODE,QDRANT_HOST,QDRANT_PORT,QDRANT_UPSERT_BATCH_SIZE,QDRANT_UPSERT_WAIT,QDRANT_UPSERT_PARALLEL,EMBED_THREADS
 import uuid
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from sympy.codegen.cxxnodes import using
+# qdrant_client is only imported inside the functions that need it: importing the package also
+# imports fastembed and onnxruntime, which the API process must not load at startup
 
+DENSE_MODEL = "BAAI/bge-small-en-v1.5"
+SPARSE_MODEL = "Qdrant/bm42-all-minilm-l6-v2-attentions"
+
+# namespace for deterministic point ids, never change it or every point gets a new id
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2b4e-8d0a-4c53-9b8e-2a7d5e3f9c10")
 
 class Qdrant:
     def __init__(self):
+        from qdrant_client import QdrantClient
         self.client = QdrantClient(host=QDRANT_HOST,port=QDRANT_PORT)
         self.create_collections()
 
     def create_collections(self):
         try:
             if(self.client):
-                self.client.create_collection(
-                    collection_name=QDRANT_COLLECTION_1,
-                    vectors_config={"dense_vector":models.VectorParams(size=384, distance=models.Distance.COSINE)},
-                    sparse_vectors_config={"sparse_vector":models.SparseVectorParams()}
-                )
-                self.client.create_collection(
-                    collection_name=QDRANT_COLLECTION_2,
-                    vectors_config={"dense_vector": models.VectorParams(size=384, distance=models.Distance.COSINE)},
-                    sparse_vectors_config={"sparse_vector": models.SparseVectorParams()}
-                )
+                from app.lib.qdrant_schema import bootstrap
+                # creates whatever is missing (collections, payload indexes), see app/lib/qdrant_schema.py
+                bootstrap(self.client)
         except Exception as e:
-            # print(e)
-            pass
+            print("Error while bootstrapping qdrant collections",e)
 
     def get_client(self):
         return self.client
     
     def get_dense_embedder(self):
-        return TextEmbedding()
+        return get_dense_embedder()
     
     def get_sparse_embedder(self):
-        return SparseTextEmbedding(model_name="Qdrant/bm42-all-minilm-l6-v2-attentions")
+        return get_sparse_embedder()
     
-    def insert_raw_report_embedding(self,dense_embeddings,sparse_embeddings,report_id,user_id,chunk_id,collection_id,collection_name):
-        try:
-            sparse_vector = {
-                "indices": sparse_embeddings.indices.tolist(),
-                "values": sparse_embeddings.values.tolist()
-            }
-
-            vector={
-                "dense_vector":dense_embeddings,
-                "sparse_vector":sparse_vector
-            }
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=vector,
-                payload={
-                    "user_id": str(user_id),
-                    "report_id":str(report_id),
-                    "chunk_id":str(chunk_id),
-                    "collection_id":str(collection_id),
-                    "collection_name":str(collection_name)
-                }
+    @staticmethod
+    def point_id(report_id,collection_name,collection_id,chunk_id):
+        """Same chunk of the same row always maps to the same point, so re-vectorizing overwrites it."""
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{report_id}:{collection_name}:{collection_id}:{chunk_id}"))
+
+    def build_point(self,dense_embeddings,sparse_embeddings,report_id,user_id,chunk_id,collection_id,collection_name,row=None):
+        from qdrant_client.models import PointStruct
+        sparse_vector = {
+            "indices": sparse_embeddings.indices.tolist(),
+            "values": sparse_embeddings.values.tolist()
+        }
+
+        vector={
+            "dense_vector":dense_embeddings,
+            "sparse_vector":sparse_vector
+        }
+        payload={
+            "user_id": str(user_id),
+            "report_id":str(report_id),
+            "chunk_id":str(chunk_id),
+            "collection_id":str(collection_id),
+            "collection_name":str(collection_name)
+        }
+        if row is not None:
+            # lets search build its context without going back to the database
+            payload["row"] = row
+        return PointStruct(
+            id=self.point_id(report_id,collection_name,collection_id,chunk_id),
+            vector=vector,
+            payload=payload
+        )
+
+    def upsert_points(self,points,collection_name=QDRANT_COLLECTION_1,batch_size=QDRANT_UPSERT_BATCH_SIZE,wait=QDRANT_UPSERT_WAIT,parallel=QDRANT_UPSERT_PARALLEL):
+        """
+        Upserts many points, batch_size points per request.
+        With parallel > 1 the batches are sent from that many threads.
+        With wait=False Qdrant acknowledges a batch before it is indexed.
+        """
+        batches = [points[i:i + batch_size] for i in range(0, len(points), max(1, batch_size))]
+
+        def send(batch):
+            self.client.upsert(collection_name=collection_name, points=batch, wait=wait)
+            return len(batch)
+
+        if parallel <= 1 or len(batches) <= 1:
+            return sum(send(batch) for batch in batches)
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            return sum(executor.map(send, batches))
+
+    def _hybrid_query(self,report_id,query_str,top_k,user_id=None):
+        # vectors are computed here with the shared embedders (and memoized), instead of
+        # letting qdrant-client run its own copy of both models for every query
+        from qdrant_client import models
+        from app.lib.query_encoder import query_encoder
+        from app.lib.qdrant_schema import search_params
+        vectors = query_encoder.encode(query_str)
+        conditions = [
+            models.FieldCondition(
+                key="report_id",
+                match=models.MatchValue(value=str(report_id)),
             )
-            qdrant.upsert(collection_name=QDRANT_COLLECTION_1, points=[point])
-            print(f"Raw Text Embeddings inserted for report {report_id}")
+        ]
+        if user_id is not None and QDRANT_TENANT_MODE:
+            # lets qdrant search only this user's graph, requires user_id on every point (see --backfill-user-ids)
+            conditions.append(models.FieldCondition(key="user_id", match=models.MatchValue(value=str(user_id))))
+        return dict(
+            collection_name=QDRANT_COLLECTION_1,
+            prefetch=[
+                models.Prefetch(
+                    query=vectors.sparse,
+                    using="sparse_vector",
+                    limit=20,
+                ),
+                models.Prefetch(
+                    query=vectors.dense,
+                    using="dense_vector",
+                    params=search_params(),
+                    limit=20,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=top_k,
+            with_payload=True,
+            score_threshold=0.5,
+            query_filter=models.Filter(must=conditions)
+        )
+
+    def similarity_search_collection1(self,report_id,query_str,top_k=10,user_id=None):
+        try:
+            search_res = self.client.query_points(**self._hybrid_query(report_id,query_str,top_k,user_id))
+            return search_res.points
         except Exception as e:
-            print("Error while storing raw_report embeddings",e)
-    
-    def similarity_search_collection1(self,report_id,query_str,top_k=10):
+            print(e)
+            return None
+
+    async def similarity_search_collection1_async(self,report_id,query_str,top_k=10,user_id=None):
+        """Same search as similarity_search_collection1 through the async client, for use inside async routes."""
         try:
-            search_res = self.client.query_points(
-                collection_name=QDRANT_COLLECTION_1,
-                prefetch=[
-                    models.Prefetch(
-                        query=models.Document(
-                            text=query_str,
-                            model="Qdrant/bm42-all-minilm-l6-v2-attentions",
-                        ),
-                        using="sparse_vector",
-                        
-                        limit=20,
-                    ),
-                    models.Prefetch(
-                        query=models.Document(
-                            text=query_str,
-                            model="BAAI/bge-small-en-v1.5",
-                        ),
-                        using="dense_vector",
-                        limit=20,
-                    ),
-                ],
-                query=models.FusionQuery(fusion=models.Fusion.RRF),
-                limit=top_k,
-                with_payload=True,
-                score_threshold=0.5,
-                query_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="report_id",
-                            match=models.MatchValue(value=str(report_id)),
-                        )
-                    ]
-                )
-            )
+            query = await asyncio.to_thread(self._hybrid_query,report_id,query_str,top_k,user_id)
+            search_res = await get_async_qdrant_client().query_points(**query)
             return search_res.points
         except Exception as e:
             print(e)
             return None
 
     def delete_embeddings(self,report_ids):
+        from qdrant_client import models
         collection = QDRANT_COLLECTION_1
         self.client.delete(
             collection_name=collection,
@@ -131,7 +165,55 @@ class Qdrant:
         del self.client
 
 
-client = Qdrant()
-qdrant = client.get_client()
-dense_embedder = client.get_dense_embedder()
-sparse_embedder = client.get_sparse_embedder()
\ No newline at end of file
+# Nothing below connects to Qdrant or loads a model at import time. Each provider builds its
+# object on first use and hands the same instance to every later caller in the process.
+_providers = {}
+_providers_lock = threading.Lock()
+
+def _provide(name, factory):
+    instance = _providers.get(name)
+    if instance is None:
+        with _providers_lock:
+            instance = _providers.get(name)
+            if instance is None:
+                instance = factory()
+                _providers[name] = instance
+    return instance
+
+def get_qdrant():
+    """The Qdrant wrapper (connects and creates the collections on first call)."""
+    return _provide("qdrant", Qdrant)
+
+def get_qdrant_client():
+    return get_qdrant().get_client()
+
+def get_async_qdrant_client():
+    def connect():
+        from qdrant_client import AsyncQdrantClient
+        return AsyncQdrantClient(host=QDRANT_HOST,port=QDRANT_PORT)
+    return _provide("async_qdrant_client", connect)
+
+def get_dense_embedder():
+    def load():
+        from fastembed import TextEmbedding
+        return TextEmbedding(model_name=DENSE_MODEL, threads=EMBED_THREADS)
+    return _provide("dense_embedder", load)
+
+def get_sparse_embedder():
+    def load():
+        from fastembed import SparseTextEmbedding
+        return SparseTextEmbedding(model_name=SPARSE_MODEL, threads=EMBED_THREADS)
+    return _provide("sparse_embedder", load)
+
+_LEGACY_NAMES = {
+    "client": get_qdrant,
+    "qdrant": get_qdrant_client,
+    "dense_embedder": get_dense_embedder,
+    "sparse_embedder": get_sparse_embedder,
+}
+
+def __getattr__(name):
+    # keeps `from app.lib.qdrant import client` working, but only resolves it when asked for
+    if name in _LEGACY_NAMES:
+        return _LEGACY_NAMES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,208 @@
+"""
+Collection layout for the report collections and the migration that brings an existing
+deployment up to it.
+
+    python -m app.lib.qdrant_schema [--tenant] [--backfill-user-ids] [--recreate]
+
+Every search filters on report_id (and user_id in tenant mode) and deletes go through
+MatchAny on report_id, so those fields get keyword payload indexes; without them Qdrant
+scans payloads. In tenant mode user_id is an `is_tenant` index and the global HNSW graph
+is replaced by per-user graphs (m=0, payload_m), which keeps one user's points together.
+
+Quantization (QDRANT_QUANTIZATION) and on-disk storage (QDRANT_ON_DISK) are fixed when a
+collection is created; --recreate copies an existing collection into the current layout.
+"""
+import argparse
+from qdrant_client import QdrantClient, models
+from app.lib.constants import (
+    QDRANT_COLLECTION_1, QDRANT_COLLECTION_2, QDRANT_TENANT_MODE, QDRANT_QUANTIZATION,
+    QDRANT_QUANTIZATION_RESCORE, QDRANT_QUANTIZATION_OVERSAMPLING, QDRANT_ON_DISK,
+)
+from app.lib.create_logging import get_logger
+
+logger = get_logger("qdrant_schema", "qdrant_schema.log")
+
+DENSE_SIZE = 384
+TENANT_PAYLOAD_M = 16
+KEYWORD_FIELDS = ("report_id", "user_id", "collection_name")
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+def vectors_config(on_disk: bool = QDRANT_ON_DISK):
+    return {"dense_vector": models.VectorParams(size=DENSE_SIZE, distance=models.Distance.COSINE, on_disk=on_disk)}
+
+def sparse_vectors_config(on_disk: bool = QDRANT_ON_DISK):
+    return {"sparse_vector": models.SparseVectorParams(index=models.SparseIndexParams(on_disk=on_disk))}
+
+def hnsw_config(tenant_mode: bool = QDRANT_TENANT_MODE, on_disk: bool = QDRANT_ON_DISK):
+    if not tenant_mode and not on_disk:
+        return None
+    if not tenant_mode:
+        return models.HnswConfigDiff(on_disk=True)
+    return models.HnswConfigDiff(payload_m=TENANT_PAYLOAD_M, m=0, on_disk=on_disk)
+
+def quantization_config(mode: str = QDRANT_QUANTIZATION):
+    """int8 scalar quantization keeps ~99% recall at 1/4 of the memory, binary is 1/32 but needs rescoring."""
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"QDRANT_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {mode!r}")
+    if mode == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def search_params(mode: str = QDRANT_QUANTIZATION, rescore: bool = QDRANT_QUANTIZATION_RESCORE, oversampling: float = QDRANT_QUANTIZATION_OVERSAMPLING):
+    """Params for dense searches: candidates come from the quantized vectors and are rescored with the originals."""
+    if mode == "none":
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(ignore=False, rescore=rescore, oversampling=oversampling)
+    )
+
+def create_collection(client: QdrantClient, collection_name: str, tenant_mode: bool = QDRANT_TENANT_MODE,
+                      quantization: str = QDRANT_QUANTIZATION, on_disk: bool = QDRANT_ON_DISK):
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_config(on_disk),
+        sparse_vectors_config=sparse_vectors_config(on_disk),
+        hnsw_config=hnsw_config(tenant_mode, on_disk),
+        quantization_config=quantization_config(quantization),
+    )
+    logger.info(f"Created collection {collection_name} (tenant_mode={tenant_mode}, quantization={quantization}, on_disk={on_disk})")
+
+def payload_index_schema(field: str, tenant_mode: bool = QDRANT_TENANT_MODE):
+    if field == "user_id" and tenant_mode:
+        return models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+    return models.PayloadSchemaType.KEYWORD
+
+def ensure_collection(client: QdrantClient, collection_name: str, tenant_mode: bool = QDRANT_TENANT_MODE):
+    """Creates the collection if it is missing, otherwise switches its HNSW layout when tenant mode is on."""
+    if not client.collection_exists(collection_name):
+        create_collection(client, collection_name, tenant_mode)
+    elif tenant_mode:
+        # Qdrant rebuilds the graph in the background, search keeps working meanwhile
+        client.update_collection(collection_name=collection_name, hnsw_config=hnsw_config(tenant_mode))
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str, tenant_mode: bool = QDRANT_TENANT_MODE):
+    """Creates the keyword indexes that are missing. Returns the fields that were indexed."""
+    existing = client.get_collection(collection_name).payload_schema or {}
+    created = []
+    for field in KEYWORD_FIELDS:
+        schema = payload_index_schema(field, tenant_mode)
+        current = existing.get(field)
+        if current is not None:
+            is_tenant = getattr(current.params, "is_tenant", None) or False
+            if not (field == "user_id" and tenant_mode and not is_tenant):
+                continue
+            # a plain keyword index has to be dropped before it can come back as a tenant index
+            client.delete_payload_index(collection_name=collection_name, field_name=field, wait=True)
+        client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=schema, wait=True)
+        created.append(field)
+    if created:
+        logger.info(f"Created payload indexes {created} on {collection_name}")
+    return created
+
+def bootstrap(client: QdrantClient, tenant_mode: bool = QDRANT_TENANT_MODE):
+    """Idempotent, safe to run on every start."""
+    for collection_name in (QDRANT_COLLECTION_1, QDRANT_COLLECTION_2):
+        ensure_collection(client, collection_name, tenant_mode)
+        ensure_payload_indexes(client, collection_name, tenant_mode)
+
+def backfill_user_ids(client: QdrantClient, collection_name: str = QDRANT_COLLECTION_1, batch_size: int = 1024):
+    """
+    Points written before the worker passed user_id carry user_id "None", which a user_id
+    filter never matches. Sets the owner (the patient's creator) on every such point.
+    """
+    from app.db import SessionLocal
+    from app.models import Reports, Patient
+
+    missing = models.Filter(must=[models.FieldCondition(key="user_id", match=models.MatchValue(value="None"))])
+    report_ids, offset = set(), None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name, scroll_filter=missing, limit=batch_size,
+            offset=offset, with_payload=["report_id"], with_vectors=False,
+        )
+        report_ids.update(p.payload.get("report_id") for p in points if p.payload.get("report_id"))
+        if offset is None:
+            break
+
+    if not report_ids:
+        return 0
+    with SessionLocal() as db:
+        owners = dict(
+            db.query(Reports.id, Patient.creator_id)
+            .join(Patient, Patient.id == Reports.patient_id)
+            .filter(Reports.id.in_([int(rid) for rid in report_ids]))
+            .all()
+        )
+    for report_id, user_id in owners.items():
+        client.set_payload(
+            collection_name=collection_name,
+            payload={"user_id": str(user_id)},
+            points=models.Filter(must=[models.FieldCondition(key="report_id", match=models.MatchValue(value=str(report_id)))]),
+        )
+    logger.info(f"Backfilled user_id for {len(owners)} report(s) in {collection_name}")
+    return len(owners)
+
+def copy_points(client: QdrantClient, source: str, target: str, batch_size: int = 512):
+    offset, copied = None, 0
+    while True:
+        points, offset = client.scroll(
+            collection_name=source, limit=batch_size, offset=offset, with_payload=True, with_vectors=True,
+        )
+        if points:
+            client.upsert(
+                collection_name=target,
+                points=[models.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+                wait=True,
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+def recreate_collection(client: QdrantClient, collection_name: str, tenant_mode: bool = QDRANT_TENANT_MODE,
+                        quantization: str = QDRANT_QUANTIZATION, on_disk: bool = QDRANT_ON_DISK):
+    """
+    Rebuilds an existing collection with the current layout: copies every point to a
+    staging collection, re-creates the original with the new config and copies them back.
+    Writes made to the collection while this runs are lost, stop the workers first.
+    """
+    staging = f"{collection_name}__migrating"
+    if client.collection_exists(collection_name):
+        if not client.collection_exists(staging):
+            create_collection(client, staging, tenant_mode, quantization="none", on_disk=on_disk)
+        # point ids are kept, so re-running after a crash mid copy just overwrites
+        copied = copy_points(client, collection_name, staging)
+        logger.info(f"Copied {copied} point(s) from {collection_name} to {staging}")
+        client.delete_collection(collection_name)
+    else:
+        # a previous run died after dropping the original, the staging collection is the complete copy
+        logger.info(f"Resuming migration of {collection_name} from {staging}")
+
+    create_collection(client, collection_name, tenant_mode, quantization, on_disk)
+    ensure_payload_indexes(client, collection_name, tenant_mode)
+    restored = copy_points(client, staging, collection_name)
+    client.delete_collection(staging)
+    logger.info(f"Recreated {collection_name} with {restored} point(s)")
+    return restored
+
+if __name__ == "__main__":
+    from app.lib.qdrant import get_qdrant_client
+
+    parser = argparse.ArgumentParser(description="Create missing collections and payload indexes")
+    parser.add_argument("--tenant", action="store_true", default=QDRANT_TENANT_MODE, help="index user_id as tenant and use per-user HNSW graphs")
+    parser.add_argument("--backfill-user-ids", action="store_true", help="set user_id on points stored without one")
+    parser.add_argument("--recreate", action="store_true", help="rebuild existing collections with the current quantization/on-disk settings")
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    bootstrap(client, tenant_mode=args.tenant)
+    if args.recreate:
+        for collection_name in (QDRANT_COLLECTION_1, QDRANT_COLLECTION_2):
+            recreate_collection(client, collection_name, tenant_mode=args.tenant)
+    if args.backfill_user_ids:
+        print(f"Backfilled {backfill_user_ids(client)} report(s)")
+    for collection_name in (QDRANT_COLLECTION_1, QDRANT_COLLECTION_2):
+        print(collection_name, sorted((client.get_collection(collection_name).payload_schema or {}).keys()))
@@ -0,0 +1,59 @@
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from app.lib.qdrant import get_dense_embedder, get_sparse_embedder
+from app.lib.constants import QUERY_CACHE_SIZE
+
+@dataclass(frozen=True)
+class QueryVectors:
+    dense: list
+    sparse: "SparseVector"  # qdrant_client.models.SparseVector
+
+def normalize_query(query: str):
+    # both models use uncased tokenizers, so case and extra whitespace never change the vectors
+    return re.sub(r"\s+", " ", query or "").strip().lower()
+
+class QueryEncoder:
+    """
+    Encodes search queries locally with the process-wide dense and sparse embedders
+    (the same instances ingestion uses) and memoizes the vectors in an LRU keyed by
+    the normalized query text.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE):
+        self.maxsize = max(1, int(maxsize))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, query: str) -> QueryVectors:
+        key = normalize_query(query)
+        with self._lock:
+            vectors = self._cache.get(key)
+            if vectors is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vectors
+            self.misses += 1
+
+        from qdrant_client import models
+        dense = next(iter(get_dense_embedder().query_embed(key)))
+        sparse = next(iter(get_sparse_embedder().query_embed(key)))
+        vectors = QueryVectors(
+            dense=dense.tolist(),
+            sparse=models.SparseVector(indices=sparse.indices.tolist(), values=sparse.values.tolist()),
+        )
+
+        with self._lock:
+            self._cache[key] = vectors
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return vectors
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+query_encoder = QueryEncoder()
@@ -0,0 +1,33 @@
+import time
+from redis.exceptions import RedisError
+from app.lib.redis import r
+from app.lib.create_logging import get_logger
+
+logger = get_logger("rate_limit", "rate_limit.log")
+
+class RateLimiter:
+    """
+    Fixed window limiter in Redis: at most `limit` hits per `window` seconds for each key.
+    Counters are shared by every API process. When Redis is down requests are let through.
+    """
+    prefix = "rate_limit"
+
+    def __init__(self, name: str, limit: int, window: int):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key: str):
+        """Counts one hit. Returns (allowed, seconds until the window resets)."""
+        now = int(time.time())
+        window_start = now - now % self.window
+        redis_key = f"{self.prefix}:{self.name}:{key}:{window_start}"
+        try:
+            pipe = r.pipeline()
+            pipe.incr(redis_key)
+            pipe.expire(redis_key, self.window)
+            count, _ = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Rate limiter {self.name} unavailable: {e}")
+            return True, 0
+        return count <= self.limit, window_start + self.window - now
\ No newline at end of file
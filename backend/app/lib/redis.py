@@ -7,5 +7,9 @@ load_dotenv()
 
 r = redis.Redis(host=str(REDIS_HOST), port=int(REDIS_PORT), decode_responses=True, db=0)
 r_queue = Queue("report_tasks", connection=r)
+# staged report pipeline, each stage scales on its own (see app/workers/start.py)
+ocr_queue = Queue("report_ocr", connection=r)
+extract_queue = Queue("report_extract", connection=r)
+persist_queue = Queue("report_persist", connection=r)
 raw_data_vectorization = Queue("raw_data_vectorization",connection=r)
 email_worker = Queue("email_worker",connection=r)
\ No newline at end of file
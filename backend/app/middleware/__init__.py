@@ -1 +1,2 @@
-from .auth import get_current_user
\ No newline at end of file
+from .auth import get_current_user
+from .upload_limit import UploadSizeLimit
\ No newline at end of file
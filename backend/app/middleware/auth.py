@@ -2,7 +2,8 @@ from fastapi import Cookie, HTTPException
 import jwt
 from app.db import SessionLocal
 from app.models import User
-from app.lib import SECRET
+from app.lib import SECRET, auth_cache
+from app.lib.constants import AUTH_CACHE_ENABLED
 from fastapi.responses import JSONResponse
 
 def get_current_user(access_token: str = Cookie(None)):
@@ -31,6 +32,12 @@ def get_current_user(access_token: str = Cookie(None)):
             )
             return response
 
+        # the token is still verified above on every call, only the users lookup is cached
+        if AUTH_CACHE_ENABLED:
+            cached = auth_cache.get(access_token)
+            if cached is not None and cached.get("email") == email:
+                return cached
+
         with SessionLocal() as db:
             user = db.query(User).filter(User.email == email).first()
             if not user:
@@ -42,7 +49,9 @@ def get_current_user(access_token: str = Cookie(None)):
                 'lname':user.last_name,
                 'phonenumber':user.phone_number,
             }
-            return data
+        if AUTH_CACHE_ENABLED:
+            auth_cache.set(access_token, data, expires_at=payload.get("exp"))
+        return data
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -0,0 +1,47 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.lib.constants import UPLOAD_MAX_REQUEST_BYTES, UPLOAD_CHUNK_SIZE
+
+UPLOAD_PATHS = ("/report/upload",)
+# one chunk of slack for the multipart boundaries and form fields
+UPLOAD_MAX_BODY_BYTES = UPLOAD_MAX_REQUEST_BYTES + UPLOAD_CHUNK_SIZE
+
+class UploadSizeLimit:
+    """
+    Pure ASGI middleware that caps the request body of the upload routes, every other request
+    (SSE streams included) is passed through untouched.
+    A Content-Length over the limit is answered with 413 before the body is read. Without a
+    Content-Length the received bytes are counted, and reading stops with a 413 as soon as they
+    pass the limit, before the multipart body is spooled any further.
+    Register it before CORSMiddleware so CORS wraps it and its 413s carry the CORS headers.
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_BODY_BYTES, paths=UPLOAD_PATHS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": "Upload is too large"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # raised while the route parses the form, FastAPI's exception handler turns it into the 413 response
+                    raise HTTPException(status_code=413, detail="Upload is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
\ No newline at end of file
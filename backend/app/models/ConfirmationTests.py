@@ -1,9 +1,10 @@
 from app.db import Base
+from app.models.mixins import BulkEntityMixin
 from sqlalchemy.orm import Mapped, mapped_column, relationship,Session
 from sqlalchemy import Integer,String, ForeignKey, Enum, DateTime,Float
 from datetime import datetime
 
-class ConfirmationTests(Base):
+class ConfirmationTests(Base, BulkEntityMixin):
     __tablename__ = "confirmation_tests"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -1,10 +1,13 @@
 from app.db import Base
+from app.models.mixins import BulkEntityMixin
 from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
 from sqlalchemy import Integer,String, DateTime, Text, ForeignKey
 from datetime import datetime
 
-class ReportMetaData(Base):
+class ReportMetaData(Base, BulkEntityMixin):
     __tablename__="report_metadata"
+    # the OCR text is stored for summaries, it is not vectorized as metadata
+    payload_exclude = {"id", "report_id", "raw_ocr_text"}
 
     id:Mapped[int]=mapped_column(Integer, primary_key=True)
     patient_name:Mapped[str]=mapped_column(String,nullable=True)
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import DateTime, func, ForeignKey,Integer, String, Boolean, Text
+from sqlalchemy import DateTime, func, ForeignKey,Integer, String, Boolean, Text, select, update, exists, text
+from app.lib.constants import REPORT_NOTIFY_CHANNEL
 
 class Reports(Base):
     __tablename__="reports"
@@ -88,4 +89,54 @@ class Reports(Base):
             report.updated_at = datetime.utcnow()
             db.commit()
             db.refresh(report)
-        return report
\ No newline at end of file
+        return report
+
+    @classmethod
+    def claim_pending(cls,db:Session,limit:int):
+        """
+        Marks up to `limit` pending reports as enqueued and returns their ids, in one statement.
+        FOR UPDATE SKIP LOCKED lets any number of schedulers claim at the same time without
+        ever handing out the same report twice. Reports without media yet are left alone.
+        """
+        from app.models.ReportsMedia import ReportsMedia
+
+        pending = (
+            select(cls.id)
+            .where(
+                cls.data_extracted==False,
+                cls.enqueued==False,
+                cls.deleted==False,
+                cls.error==False,
+                exists().where(ReportsMedia.report_id == cls.id),
+            )
+            .order_by(cls.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = db.scalars(
+            update(cls)
+            .where(cls.id.in_(pending.scalar_subquery()))
+            .values(enqueued=True, updated_at=datetime.utcnow())
+            .returning(cls.id)
+        ).all()
+        db.commit()
+        return sorted(claimed)
+
+    @classmethod
+    def release(cls,db:Session,ids:List[int]):
+        """Puts claimed reports back in the pending state, for when they could not be enqueued."""
+        db.execute(update(cls).where(cls.id.in_(ids)).values(enqueued=False))
+        db.commit()
+
+    @classmethod
+    def notify_statement(cls,id:int):
+        """pg_notify for the schedulers, executable on a sync Session or an AsyncSession."""
+        return text("SELECT pg_notify(:channel, :payload)").bindparams(channel=REPORT_NOTIFY_CHANNEL, payload=str(id))
+
+    @classmethod
+    def notify_uploaded(cls,db:Session,id:int):
+        """
+        Queues a NOTIFY for the schedulers. Postgres only delivers it when the current
+        transaction commits, so call it before the commit that makes the report claimable.
+        """
+        db.execute(cls.notify_statement(id))
\ No newline at end of file
@@ -11,6 +11,8 @@ class ReportsMedia(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     report_id: Mapped[int] = mapped_column(ForeignKey("reports.id",ondelete="CASCADE"), nullable=False)
     url:Mapped[str] = mapped_column(String,nullable=False)
+    # sha256 of the uploaded bytes, identical uploads of a patient share one file
+    content_hash:Mapped[str] = mapped_column(String(64),nullable=True,index=True)
     report: Mapped["Reports"] = relationship(back_populates="reports_media")
 
     def to_dict(self, include_report: bool = False) -> Dict[str, Any]:
@@ -19,6 +21,7 @@ class ReportsMedia(Base):
             "id": self.id,
             "report_id": self.report_id,
             "url": self.url,
+            "content_hash": self.content_hash,
         }
 
         return data
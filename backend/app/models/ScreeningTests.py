@@ -1,9 +1,10 @@
 from app.db import Base
+from app.models.mixins import BulkEntityMixin
 from sqlalchemy.orm import Mapped, mapped_column, relationship,Session
 from sqlalchemy import Integer,String, ForeignKey, Enum, DateTime
 from datetime import datetime
 
-class ScreeningTests(Base):
+class ScreeningTests(Base, BulkEntityMixin):
     __tablename__ = "screening_tests"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
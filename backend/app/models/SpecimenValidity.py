@@ -1,9 +1,10 @@
 from app.db import Base
+from app.models.mixins import BulkEntityMixin
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import Integer,String, ForeignKey,Float
 from sqlalchemy.orm import Session
 
-class SpecimenValidity(Base):
+class SpecimenValidity(Base, BulkEntityMixin):
     __tablename__ = "specimen_validity"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -1,9 +1,10 @@
 from app.db import Base
+from app.models.mixins import BulkEntityMixin
 from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
 from sqlalchemy import Integer,String, DateTime, Text, ForeignKey, Enum,Float
 from datetime import datetime
 
-class TestResults(Base):
+class TestResults(Base, BulkEntityMixin):
     __tablename__ = "test_results"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -12,3 +12,4 @@ from .ReportsMedia import ReportsMedia
 from .Chat import Chat
 from .AISummary import AISummary
 from .Patient import Patient
+from .context import MAPPINGS, resolve_context, resolve_context_async
@@ -0,0 +1,68 @@
+from .ReportMetadata import ReportMetaData
+from .SpecimenValidity import SpecimenValidity
+from .TestResults import TestResults
+from .ScreeningTests import ScreeningTests
+from .ConfirmationTests import ConfirmationTests
+from .ReportedMedications import ReportedMedications
+
+MAPPINGS = {
+    "specimen_validity":SpecimenValidity,
+    "report_metadata":ReportMetaData,
+    "test_results":TestResults,
+    "screening_tests":ScreeningTests,
+    "confirmation_tests":ConfirmationTests,
+    "reported_medications":ReportedMedications
+}
+
+def _collection_id(payload):
+    try:
+        return int(payload.get("collection_id"))
+    except (TypeError, ValueError):
+        return None
+
+def _wanted_ids(payloads: list[dict]):
+    wanted = {}
+    for payload in payloads:
+        if payload.get("row") is None and payload.get("collection_name") in MAPPINGS:
+            collection_id = _collection_id(payload)
+            if collection_id is not None:
+                wanted.setdefault(payload["collection_name"], set()).add(collection_id)
+    return wanted
+
+def _fetch_rows(db, wanted: dict):
+    return {
+        collection_name: MAPPINGS[collection_name].get_by_ids(db=db, ids=list(ids))
+        for collection_name, ids in wanted.items()
+    }
+
+def _ordered_context(payloads: list[dict], fetched: dict):
+    context = []
+    for payload in payloads:
+        if payload.get("row") is not None:
+            context.append(payload["row"])
+            continue
+        row = fetched.get(payload.get("collection_name"), {}).get(_collection_id(payload))
+        if row is not None:
+            context.append(row)
+    return context
+
+def resolve_context(payloads: list[dict], session_factory):
+    """
+    Turns search hit payloads into the rows they point to, keeping the hits' rank order.
+    Hits that carry the serialized row in their payload ("row") need no database access.
+    The rest are grouped by collection_name and fetched with one IN (...) query per
+    collection, all in one session opened from `session_factory`.
+    Hits whose collection or row no longer exists are skipped.
+    """
+    wanted = _wanted_ids(payloads)
+    fetched = {}
+    if wanted:
+        with session_factory() as db:
+            fetched = _fetch_rows(db, wanted)
+    return _ordered_context(payloads, fetched)
+
+async def resolve_context_async(payloads: list[dict], db):
+    """resolve_context on an AsyncSession, the same get_by_ids queries run through run_sync."""
+    wanted = _wanted_ids(payloads)
+    fetched = await db.run_sync(_fetch_rows, wanted) if wanted else {}
+    return _ordered_context(payloads, fetched)
\ No newline at end of file
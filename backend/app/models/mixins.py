@@ -0,0 +1,45 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+class BulkEntityMixin:
+    """
+    Bulk insert/fetch shared by the extracted report entities.
+    `payload_exclude` are the columns left out of the dicts handed to vectorization.
+    """
+    payload_exclude = {"id", "report_id"}
+
+    @classmethod
+    def bulk_create(cls, session: Session, rows: list[dict]):
+        """
+        Inserts many records with one multi-row INSERT ... RETURNING. Does not commit.
+        Returns (clean_dict, id) pairs in the same order as `rows`. The dicts hold the stored
+        values, column defaults like created_at included, same as create() after its refresh.
+        """
+        if not rows:
+            return []
+        columns = list(cls.__table__.columns)
+        stored = session.execute(insert(cls).returning(*columns, sort_by_parameter_order=True), rows).mappings().all()
+
+        # Drop 'id' and any None values
+        return [
+            ({c.key: row[c] for c in columns if c.key not in cls.payload_exclude and row[c] is not None}, row[cls.__table__.c.id])
+            for row in stored
+        ]
+
+    @classmethod
+    def get_by_ids(cls, db: Session, ids: list[int]):
+        """Fetches many records with one IN (...) query. Returns {id: readable_dict}."""
+        exclude = [
+            "id","report_id"
+        ]
+        if not ids:
+            return {}
+        rows = db.query(cls).filter(cls.id.in_(ids)).all()
+        return {
+            row.id: {
+                c.name: getattr(row, c.name)
+                for c in cls.__table__.columns
+                if c.name not in exclude
+            }
+            for row in rows
+        }
\ No newline at end of file
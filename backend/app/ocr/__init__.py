@@ -1,3 +1,6 @@
-from .extraction import text_extraction
-from .preprocess import preprocess_image
-from .llm_response import llm_class
\ No newline at end of file
+from .extraction import text_extraction, batch_text_extraction
+from .preprocess import preprocess_image, preprocess_page, read_image_bytes
+from .engine_pool import ocr_pool
+from .cache import ocr_cache, content_hash
+from .llm_cache import extraction_cache
+from .llm_response import llm_class
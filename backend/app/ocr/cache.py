@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+import time
+from redis.exceptions import RedisError
+from app.lib.redis import r
+from app.lib.constants import (
+    OCR_LANG, OCR_VERSION, OCR_USE_ANGLE_CLS, OCR_PREPROCESS_PROFILE,
+    OCR_NOISE_SKIP_BELOW, OCR_NOISE_FAST_BELOW, OCR_BLUR_BELOW, OCR_CACHE_VERSION,
+    OCR_CACHE_MAX_ENTRIES, OCR_CACHE_DIR,
+)
+from app.lib.create_logging import get_logger
+
+logger = get_logger("ocr_cache", "ocr_cache.log")
+
+def ocr_config_version():
+    """Anything that changes the OCR text of a page must be part of this, so old entries stop matching."""
+    config = "|".join(str(v) for v in (
+        OCR_CACHE_VERSION, OCR_LANG, OCR_VERSION, OCR_USE_ANGLE_CLS,
+        OCR_PREPROCESS_PROFILE, OCR_NOISE_SKIP_BELOW, OCR_NOISE_FAST_BELOW, OCR_BLUR_BELOW,
+    ))
+    return hashlib.sha256(config.encode()).hexdigest()[:12]
+
+def content_hash(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+class OCRCache:
+    """
+    Page text cache keyed by the sha256 of the uploaded bytes plus the OCR config version.
+    Entries live in Redis and fall back to OCR_CACHE_DIR on disk when Redis is unavailable.
+    Both stores keep at most `max_entries` pages and evict the least recently used ones.
+    """
+    prefix = "ocr_cache"
+
+    def __init__(self, max_entries: int = OCR_CACHE_MAX_ENTRIES, cache_dir: str = OCR_CACHE_DIR):
+        self.max_entries = max(1, int(max_entries))
+        self.cache_dir = cache_dir
+        self.version = ocr_config_version()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, digest: str):
+        return f"{self.prefix}:{self.version}:{digest}"
+
+    def _disk_path(self, digest: str):
+        return os.path.join(self.cache_dir, f"{self.version}_{digest}.txt")
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        try:
+            r.incr(f"{self.prefix}:{'hits' if hit else 'misses'}")
+        except RedisError:
+            pass
+
+    def get(self, digest: str):
+        key = self._key(digest)
+        try:
+            text = r.get(key)
+            if text is not None:
+                r.zadd(f"{self.prefix}:lru", {key: time.time()})
+        except RedisError:
+            text = self._disk_get(digest)
+        self._count(text is not None)
+        return text
+
+    def set(self, digest: str, text: str):
+        key = self._key(digest)
+        try:
+            pipe = r.pipeline()
+            pipe.set(key, text)
+            pipe.zadd(f"{self.prefix}:lru", {key: time.time()})
+            pipe.execute()
+            self._evict()
+        except RedisError as e:
+            logger.warning(f"Redis unavailable, caching OCR text on disk. Error: {e}")
+            self._disk_set(digest, text)
+
+    def _evict(self):
+        overflow = r.zcard(f"{self.prefix}:lru") - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = [key for key, _ in r.zpopmin(f"{self.prefix}:lru", overflow)]
+        if evicted:
+            r.delete(*evicted)
+
+    def _disk_get(self, digest: str):
+        path = self._disk_path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+            return text
+        except FileNotFoundError:
+            return None
+
+    def _disk_set(self, digest: str, text: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._disk_path(digest), "w", encoding="utf-8") as f:
+            f.write(text)
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        data = {"hits": self.hits, "misses": self.misses}
+        try:
+            data["total_hits"] = int(r.get(f"{self.prefix}:hits") or 0)
+            data["total_misses"] = int(r.get(f"{self.prefix}:misses") or 0)
+        except RedisError:
+            pass
+        return data
+
+ocr_cache = OCRCache()
@@ -0,0 +1,90 @@
+import threading
+from contextlib import contextmanager
+from queue import Queue, Empty
+from app.lib.constants import OCR_POOL_SIZE, OCR_LANG, OCR_VERSION, OCR_USE_ANGLE_CLS
+from app.lib.create_logging import get_logger
+
+logger = get_logger("ocr_pool", "ocr_pool.log")
+
+DEFAULT_CONFIG = (OCR_LANG, OCR_VERSION, OCR_USE_ANGLE_CLS)
+
+class OCREnginePool:
+    """
+    Keeps loaded PaddleOCR engines around for the life of the worker process.
+    Engines are grouped by config (lang, ocr_version, use_angle_cls) and each
+    group holds at most `size` engines.
+    Usage:
+        engine = ocr_pool.checkout()
+        try:
+            engine.predict(input=img)
+        finally:
+            ocr_pool.checkin(engine)
+    """
+
+    def __init__(self, size: int = OCR_POOL_SIZE):
+        self.size = max(1, int(size))
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._created = {}
+        self._config_of = {}
+
+    def _create_engine(self, config):
+        # imported here so that importing app.ocr (e.g. for llm_class in the API) doesn't load paddle
+        from paddleocr import PaddleOCR
+
+        lang, ocr_version, use_angle_cls = config
+        engine = PaddleOCR(
+            lang=lang,
+            use_angle_cls=use_angle_cls,
+            ocr_version=ocr_version,
+            enable_mkldnn=False,
+        )
+        logger.info(f"Loaded OCR engine for config {config}")
+        return engine
+
+    def checkout(self, config=DEFAULT_CONFIG, timeout=None):
+        """Returns an idle engine for `config`, loading a new one while the group is below pool size."""
+        with self._lock:
+            idle = self._idle.setdefault(config, Queue())
+            create = idle.empty() and self._created.get(config, 0) < self.size
+            if create:
+                self._created[config] = self._created.get(config, 0) + 1
+
+        if not create:
+            try:
+                return idle.get(timeout=timeout)
+            except Empty:
+                raise TimeoutError(f"No OCR engine available for config {config}")
+
+        try:
+            engine = self._create_engine(config)
+        except Exception:
+            with self._lock:
+                self._created[config] -= 1
+            raise
+        self._config_of[id(engine)] = config
+        return engine
+
+    def checkin(self, engine):
+        config = self._config_of.get(id(engine))
+        if config is None:
+            return
+        self._idle[config].put(engine)
+
+    @contextmanager
+    def engine(self, config=DEFAULT_CONFIG):
+        engine = self.checkout(config)
+        try:
+            yield engine
+        finally:
+            self.checkin(engine)
+
+    def warm_up(self, config=DEFAULT_CONFIG, count=None):
+        """Loads `count` engines (defaults to the pool size) up front so the first job doesn't pay for it."""
+        count = self.size if count is None else min(count, self.size)
+        engines = [self.checkout(config) for _ in range(count)]
+        for engine in engines:
+            self.checkin(engine)
+        logger.info(f"OCR pool warmed up with {count} engine(s) for config {config}")
+
+ocr_pool = OCREnginePool()
@@ -1,26 +1,42 @@
-from paddleocr import PaddleOCR
 from app.ocr.preprocess import preprocess_image
+from app.ocr.engine_pool import ocr_pool
+from app.lib.constants import OCR_BATCH_SIZE
 
-def text_extraction(img: str):
-    ocr = PaddleOCR(
-        lang='en',
-        use_angle_cls=False,
-        ocr_version='PP-OCRv3',
-        enable_mkldnn=False,
-    )
+def _rec_text(page_result):
+    if isinstance(page_result, dict) and 'rec_texts' in page_result:
+        return '\n'.join(page_result['rec_texts'])
+    return ''
 
-    result = ocr.predict(input=img)
+def text_extraction(img: str, engine=None):
+    if engine is None:
+        with ocr_pool.engine() as pooled:
+            return text_extraction(img=img, engine=pooled)
+
+    result = engine.predict(input=img)
     if result and len(result) > 0:
-        if isinstance(result[0], dict) and 'rec_texts' in result[0]:
-            text = result[0]['rec_texts']
-        else:
-            text = []
-    else:
-        text = []
-    text_string = '\n'.join(text)
-    return text_string
+        return _rec_text(result[0])
+    return ''
+
+def batch_text_extraction(imgs: list, batch_size: int = OCR_BATCH_SIZE, engine=None) -> list[str]:
+    """
+    Runs OCR over many pages with one predict call per `batch_size` pages.
+    Returns one text per input page, in the same order as `imgs`.
+    """
+    if engine is None:
+        with ocr_pool.engine() as pooled:
+            return batch_text_extraction(imgs=imgs, batch_size=batch_size, engine=pooled)
+
+    batch_size = max(1, int(batch_size))
+    texts = []
+    for start in range(0, len(imgs), batch_size):
+        batch = imgs[start:start + batch_size]
+        result = list(engine.predict(input=batch) or [])
+        if len(result) != len(batch):
+            raise ValueError(f"OCR returned {len(result)} results for a batch of {len(batch)} pages")
+        texts.extend(_rec_text(page) for page in result)
+    return texts
 
 
 if __name__=="__main__":
     img=preprocess_image(img_src='../../public/processed/dbd512ba-0f19-463c-9b7b-0f96ab487efb.jpg')
-    print(text_extraction(img=img))
\ No newline at end of file
+    print(text_extraction(img=img))
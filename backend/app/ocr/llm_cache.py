@@ -0,0 +1,105 @@
+import hashlib
+import json
+import re
+import time
+from redis.exceptions import RedisError
+from app.lib.redis import r
+from app.lib.llm import LLM_MODEL
+from app.lib.prompt import get_extraction_prompt
+from app.lib.constants import EXTRACTION_CACHE_VERSION, EXTRACTION_CACHE_TTL, EXTRACTION_CACHE_MAX_ENTRIES
+from app.lib.create_logging import get_logger
+
+logger = get_logger("extraction_cache", "extraction_cache.log")
+
+def prompt_version(prompt: str = None):
+    """Changes whenever the extraction prompt, the model or EXTRACTION_CACHE_VERSION changes."""
+    prompt = get_extraction_prompt() if prompt is None else prompt
+    source = f"{EXTRACTION_CACHE_VERSION}|{LLM_MODEL}|{prompt}"
+    return hashlib.sha256(source.encode()).hexdigest()[:12]
+
+def normalize_ocr_text(text: str):
+    return re.sub(r"\s+", " ", text or "").strip()
+
+class ExtractionCache:
+    """
+    Parsed extraction JSON keyed by the hash of the normalized OCR text and the prompt version.
+    Entries expire after `ttl` seconds and at most `max_entries` are kept (least recently used go first).
+    Keeps hit/miss counters and the LLM time saved by hits in Redis.
+    """
+    prefix = "extraction_cache"
+
+    def __init__(self, ttl: int = EXTRACTION_CACHE_TTL, max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES, prompt: str = None):
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self.version = prompt_version(prompt)
+
+    def _key(self, ocr_text: str):
+        digest = hashlib.sha256(normalize_ocr_text(ocr_text).encode()).hexdigest()
+        return f"{self.prefix}:{self.version}:{digest}"
+
+    def get(self, ocr_text: str):
+        key = self._key(ocr_text)
+        try:
+            raw = r.get(key)
+            if raw is None:
+                r.incr(f"{self.prefix}:misses")
+                return None
+            entry = json.loads(raw)
+            pipe = r.pipeline()
+            pipe.zadd(f"{self.prefix}:lru", {key: time.time()})
+            pipe.incr(f"{self.prefix}:hits")
+            pipe.incrbyfloat(f"{self.prefix}:saved_ms", entry.get("latency_ms", 0))
+            pipe.execute()
+            return entry["result"]
+        except RedisError as e:
+            logger.warning(f"Extraction cache unavailable: {e}")
+            return None
+
+    def set(self, ocr_text: str, result, latency_ms: float):
+        key = self._key(ocr_text)
+        try:
+            pipe = r.pipeline()
+            pipe.set(key, json.dumps({"result": result, "latency_ms": latency_ms}), ex=self.ttl)
+            pipe.zadd(f"{self.prefix}:lru", {key: time.time()})
+            pipe.execute()
+            self._evict()
+        except RedisError as e:
+            logger.warning(f"Could not cache extraction result: {e}")
+
+    def _evict(self):
+        lru = f"{self.prefix}:lru"
+        # entries that already expired through the TTL
+        r.zremrangebyscore(lru, "-inf", time.time() - self.ttl)
+        overflow = r.zcard(lru) - self.max_entries
+        if overflow > 0:
+            evicted = [key for key, _ in r.zpopmin(lru, overflow)]
+            if evicted:
+                r.delete(*evicted)
+
+    def invalidate(self, all_versions: bool = False):
+        """
+        Drops entries written for other prompt versions (or every entry with all_versions=True).
+        Old versions never match again after a prompt change, this only frees their memory.
+        """
+        current = f"{self.prefix}:{self.version}:"
+        removed = 0
+        for key in r.scan_iter(match=f"{self.prefix}:*:*", count=500):
+            if all_versions or not key.startswith(current):
+                r.delete(key)
+                r.zrem(f"{self.prefix}:lru", key)
+                removed += 1
+        logger.info(f"Invalidated {removed} extraction cache entries")
+        return removed
+
+    def stats(self):
+        hits = int(r.get(f"{self.prefix}:hits") or 0)
+        misses = int(r.get(f"{self.prefix}:misses") or 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "saved_llm_ms": float(r.get(f"{self.prefix}:saved_ms") or 0),
+            "prompt_version": self.version,
+        }
+
+extraction_cache = ExtractionCache()
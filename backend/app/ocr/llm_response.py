@@ -5,6 +5,9 @@ import re
 from app.db import SessionLocal
 from fastapi.responses import StreamingResponse
 from app.models import Reports
+from app.lib.constants import EXTRACTION_CACHE_ENABLED
+from app.ocr.llm_cache import extraction_cache, prompt_version
+import time
 
 class llm_class:
     prompt = ""
@@ -63,7 +66,15 @@ class llm_class:
         response=self.prompt_template | llm
 
         if self.report_data:
+          use_cache = EXTRACTION_CACHE_ENABLED and prompt_version(self.prompt) == extraction_cache.version
+          if use_cache:
+              cached = extraction_cache.get(self.report_data)
+              if cached is not None:
+                  return cached
+
+          started = time.perf_counter()
           result = response.invoke({"report_text": self.report_data})
+          latency_ms = (time.perf_counter() - started) * 1000
           if(result.content.lower() == "not a valid test report"):
               with SessionLocal() as db:
                   Reports.mark_error(errormsg=result.content,db=db,id=self.report_id)
@@ -72,6 +83,8 @@ class llm_class:
           removedPrefix=result.content.removeprefix("```json")
           final_text=removedPrefix.removesuffix("```")
           json_text=json.loads(final_text)
+          if use_cache:
+              extraction_cache.set(self.report_data, json_text, latency_ms)
           return json_text
         if self.raw_ocr_text:
            result = response.invoke({"raw_ocr_text": self.raw_ocr_text})
@@ -83,5 +96,14 @@ class llm_class:
 
         # Directly yield content chunks
         for chunk in response.stream({"query": user_q, "search_results": q_context,"context":prev_context}):
+            if chunk and getattr(chunk, "content", None):
+                yield chunk.content
+
+    async def call_llm_astream(self, user_q, q_context,prev_context=[]):
+        """Async version of call_llm_stream. Closing the generator stops the Groq stream."""
+        self.chain_prompt()
+        response = self.prompt_template | llm
+
+        async for chunk in response.astream({"query": user_q, "search_results": q_context,"context":prev_context}):
             if chunk and getattr(chunk, "content", None):
                 yield chunk.content
\ No newline at end of file
@@ -3,34 +3,131 @@ import numpy as np
 import requests
 from urllib.parse import urlparse
 import os
+import time
+from app.lib.constants import BASE_URL, UPLOADS_DIR, OCR_IN_MEMORY, OCR_DEBUG_DUMP, OCR_PREPROCESS_PROFILE, OCR_NOISE_SKIP_BELOW, OCR_NOISE_FAST_BELOW, OCR_BLUR_BELOW
 
-def preprocess_image(img_src: str):
-    # --- Load image ---
+PROCESSED_DIR = "public/processed"
+PROFILES = ("skip", "fast", "full")
+
+if OCR_PREPROCESS_PROFILE not in ("auto",) + PROFILES:
+    raise ValueError(f"OCR_PREPROCESS_PROFILE must be one of auto, {', '.join(PROFILES)}, got {OCR_PREPROCESS_PROFILE!r}")
+
+# Immerkaer's noise estimation kernel, see estimate_quality
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+def resolve_local_upload(img_src: str):
+    """Maps a BASE_URL/uploads/<name> url back to the file in UPLOADS_DIR, if it is stored on this machine."""
+    if not BASE_URL or not UPLOADS_DIR:
+        return None
+    prefix = BASE_URL + "uploads/"
+    if not img_src.startswith(prefix):
+        return None
+    local_path = os.path.join(UPLOADS_DIR, os.path.basename(urlparse(img_src).path))
+    return local_path if os.path.exists(local_path) else None
+
+def read_image_bytes(img_src: str) -> bytes:
+    local_path = resolve_local_upload(img_src)
+    if local_path:
+        with open(local_path, "rb") as f:
+            return f.read()
     if urlparse(img_src).scheme in ("http", "https"):
         # Load from URL
         resp = requests.get(img_src)
         if resp.status_code != 200:
             raise ValueError(f"Cannot fetch image from URL: {img_src}")
-        arr = np.frombuffer(resp.content, np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    else:
-        # Load from local file
-        if not os.path.exists(img_src):
-            raise ValueError(f"File does not exist: {img_src}")
-        img = cv2.imread(img_src)
+        return resp.content
+    # Load from local file
+    if not os.path.exists(img_src):
+        raise ValueError(f"File does not exist: {img_src}")
+    with open(img_src, "rb") as f:
+        return f.read()
 
+def load_image(img_src: str, data: bytes = None):
+    if data is None:
+        data = read_image_bytes(img_src)
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
     if img is None:
         raise ValueError(f"Failed to load image: {img_src}")
+    return img
+
+def dump_image(name: str, step: str, img):
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    stem, ext = os.path.splitext(name)
+    cv2.imwrite(os.path.join(PROCESSED_DIR, f"{stem}_{step}{ext or '.jpg'}"), img)
+
+def estimate_quality(img):
+    """
+    Cheap page quality scores used to pick a preprocessing profile.
+    noise: Immerkaer's fast noise sigma estimate (clean scans sit around 1-2, noisy phone photos well above 5).
+    sharpness: variance of the Laplacian, low values mean a blurry page.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
+    h, w = gray.shape[:2]
+    if h < 3 or w < 3:
+        return {"noise": 0.0, "sharpness": 0.0}
+    residual = cv2.filter2D(gray.astype(np.float32), -1, NOISE_KERNEL)
+    noise = float(np.abs(residual[1:-1, 1:-1]).sum() * np.sqrt(0.5 * np.pi) / (6 * (w - 2) * (h - 2)))
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    return {"noise": noise, "sharpness": sharpness}
+
+def choose_profile(quality: dict):
+    # a blurry page is denoised even when it looks clean, skipping only pays off on sharp scans
+    if quality["noise"] < OCR_NOISE_SKIP_BELOW and quality["sharpness"] >= OCR_BLUR_BELOW:
+        return "skip"
+    if quality["noise"] < OCR_NOISE_FAST_BELOW:
+        return "fast"
+    return "full"
+
+def preprocess_page(img_src: str, data: bytes = None, profile: str = OCR_PREPROCESS_PROFILE, in_memory: bool = OCR_IN_MEMORY, debug: bool = OCR_DEBUG_DUMP):
+    """
+    Cleans up a report page for OCR and returns (page, stats).
+    The denoising step depends on `profile`:
+        skip: no denoising, fast: grayscale fastNlMeansDenoising with a small search window,
+        full: fastNlMeansDenoisingColored, auto: picked from estimate_quality.
+    In memory mode (default) the processed page is a BGR ndarray that can be passed straight
+    to the OCR engine; otherwise it is written to public/processed and the path is returned.
+    With `debug` every intermediate step is also dumped there.
+    stats holds the chosen profile, the quality scores and per step timings in ms.
+    `data` can carry the already downloaded bytes of `img_src`.
+    """
+    name = os.path.basename(urlparse(img_src).path) or "page.jpg"
+    timings = {}
+    started = time.perf_counter()
+
+    def lap(step):
+        nonlocal started
+        now = time.perf_counter()
+        timings[step] = round((now - started) * 1000, 2)
+        started = now
+
+    # --- Load image ---
+    img = load_image(img_src, data=data)
 
     # --- Ensure BGR for denoising ---
     if len(img.shape) == 2:  # grayscale
         img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    lap("load")
 
-    # --- Denoising ---
-    img = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
+    # --- Pick a profile ---
+    quality = estimate_quality(img)
+    if profile == "auto":
+        profile = choose_profile(quality)
+    elif profile not in PROFILES:
+        raise ValueError(f"Unknown preprocessing profile {profile!r}, expected auto or one of {', '.join(PROFILES)}")
+    lap("estimate")
 
-    # --- Convert to grayscale ---
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # --- Denoising + grayscale ---
+    if profile == "full":
+        img = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    elif profile == "fast":
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 11)
+    else:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    lap("denoise")
+    if debug:
+        dump_image(name, "denoised", gray)
 
     # --- Cropping non-zero area ---
     coords = cv2.findNonZero(gray)
@@ -42,16 +139,37 @@ def preprocess_image(img_src: str):
 
     # --- Thresholding ---
     ret, thresh = cv2.threshold(cropped, 127, 255, cv2.THRESH_TOZERO)
+    lap("threshold")
+    if debug:
+        dump_image(name, "thresholded", thresh)
 
     # --- Resizing ---
     resized = cv2.resize(thresh, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_CUBIC)
+    lap("resize")
+
+    stats = {
+        "src": img_src,
+        "profile": profile,
+        "noise": round(quality["noise"], 3),
+        "sharpness": round(quality["sharpness"], 3),
+        "timings_ms": timings,
+    }
+
+    if in_memory:
+        if debug:
+            dump_image(name, "processed", resized)
+        # PaddleOCR expects the 3 channel layout it would get from decoding the file
+        return cv2.cvtColor(resized, cv2.COLOR_GRAY2BGR), stats
 
     # --- Save and return ---
-    name=img_src.split("/")
-    name = name[len(name)-1]
-    output_path = f"public/processed/{name}"
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    output_path = f"{PROCESSED_DIR}/{name}"
     cv2.imwrite(output_path, resized)
-    return output_path
+    return output_path, stats
+
+def preprocess_image(img_src: str, data: bytes = None, profile: str = OCR_PREPROCESS_PROFILE, in_memory: bool = OCR_IN_MEMORY, debug: bool = OCR_DEBUG_DUMP):
+    page, _ = preprocess_page(img_src=img_src, data=data, profile=profile, in_memory=in_memory, debug=debug)
+    return page
 
 if __name__ == "__main__":
-    preprocess_image("http://localhost:5000/uploads/790ef119-4762-44b1-bb32-9d2e0828be8d.jpg")
+    preprocess_image("http://localhost:5000/uploads/790ef119-4762-44b1-bb32-9d2e0828be8d.jpg", in_memory=False)
@@ -1,23 +1,38 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.schemas import SignupSchema, LoginSchema
 from app.db import get_db
-from passlib.context import CryptContext
 from app.models import User
 from app.lib import email_worker
-from app.workers import send_email
-from app.lib import JWT
+from app.workers.email_workers import send_email
+from app.lib import JWT, auth_cache
+from app.lib.password_hasher import password_hasher, PasswordHasherBusy
+from app.lib.rate_limit import RateLimiter
+from app.lib.constants import AUTH_RATE_LIMIT_WINDOW, AUTH_RATE_LIMIT_PER_IP, AUTH_RATE_LIMIT_PER_EMAIL
 from jwt import ExpiredSignatureError, InvalidTokenError
 from app.middleware import get_current_user
 
 jwt = JWT()
 router=APIRouter(prefix="/auth")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ip_limiter = RateLimiter("auth_ip", AUTH_RATE_LIMIT_PER_IP, AUTH_RATE_LIMIT_WINDOW)
+email_limiter = RateLimiter("auth_email", AUTH_RATE_LIMIT_PER_EMAIL, AUTH_RATE_LIMIT_WINDOW)
+
+def check_rate_limit(request: Request, email: str):
+    """Runs before any bcrypt work, so a burst is turned away before it reaches the hashing pool."""
+    client_ip = request.client.host if request.client else "unknown"
+    for limiter, key in ((ip_limiter, client_ip), (email_limiter, email.lower())):
+        allowed, retry_after = limiter.hit(key)
+        if not allowed:
+            raise HTTPException(status_code=429, detail="Too many attempts. Please try again later", headers={"Retry-After": str(retry_after)})
+
+def hashing_unavailable():
+    return HTTPException(status_code=503, detail="Server busy. Please try again", headers={"Retry-After": "1"})
 
 @router.post("/signup")
-def signup(payload: SignupSchema,db: Session = Depends(get_db)):
+def signup(payload: SignupSchema,request: Request,db: Session = Depends(get_db)):
     try:    
+        check_rate_limit(request, payload.email)
 
         if len(payload.password.strip()) < 8:
             raise HTTPException(status_code=400,detail="Password Length should me more than 8 characters")
@@ -30,7 +45,7 @@ def signup(payload: SignupSchema,db: Session = Depends(get_db)):
         if existing_user and existing_user.is_verified == True:
             raise HTTPException(status_code=404,detail="User already exists")
         
-        hashed_password = pwd_context.hash(payload.password)
+        hashed_password = password_hasher.hash(payload.password)
         email=payload.email
         token = jwt.generate_token(email=email,time=15)
 
@@ -43,6 +58,8 @@ def signup(payload: SignupSchema,db: Session = Depends(get_db)):
             existing_user.verification_token = token
             db.commit()
             db.refresh(existing_user)
+            # password and profile changed
+            auth_cache.invalidate_user(existing_user.email)
 
             email_worker.enqueue(send_email,payload.email,payload.fname ,"VERIFICATION",token)
 
@@ -72,6 +89,9 @@ def signup(payload: SignupSchema,db: Session = Depends(get_db)):
 
     except HTTPException as e:
         raise e
+    except PasswordHasherBusy:
+        db.rollback()
+        raise hashing_unavailable()
     except Exception as e:
         print(e)
         db.rollback()
@@ -93,6 +113,7 @@ def verify(token:str,db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Invalid Token. User not found")
         
         User.verify_user(db=db, id=existing_user.id)
+        auth_cache.invalidate_user(existing_user.email)
 
         return JSONResponse(status_code=200,content={
                 "message":"Account Verified. You can Login now"
@@ -111,26 +132,31 @@ def verify(token:str,db: Session = Depends(get_db)):
 
 
 @router.post("/signin")
-def signin(payload: LoginSchema,db: Session = Depends(get_db)):
+def signin(payload: LoginSchema,request: Request,db: Session = Depends(get_db)):
     try:
+        check_rate_limit(request, payload.email)
         existing_user = db.query(User).filter(User.email == payload.email).first()
         if not existing_user:
                 raise HTTPException(status_code=404, detail="Invalid credentials")
 
         if existing_user and not existing_user.is_verified:
             token = jwt.generate_token(existing_user.email, time=15)
-            hashed_password = pwd_context.hash(payload.password)
             existing_user.verification_token = token
-            existing_user.password = hashed_password
+            # only re-hash when the password actually changed, retries with the same one cost a single verify
+            password_changed = not password_hasher.verify(payload.password, existing_user.password)
+            if password_changed:
+                existing_user.password = password_hasher.hash(payload.password)
             email_worker.enqueue(send_email,payload.email,existing_user.first_name,"VERIFICATION",token)
             db.commit()
             db.refresh(existing_user)
+            if password_changed:
+                auth_cache.invalidate_user(existing_user.email)
             return JSONResponse(
                     status_code=200,
                     content={"message": "Account not verified. Verification email sent"}
             )
 
-        if not pwd_context.verify(payload.password, existing_user.password):
+        if not password_hasher.verify(payload.password, existing_user.password):
                 raise HTTPException(status_code=401, detail="Invalid credentials")
 
         access_token = jwt.generate_token(existing_user.email, time=1440) 
@@ -174,6 +200,9 @@ def signin(payload: LoginSchema,db: Session = Depends(get_db)):
         return response
     except HTTPException as e:
         raise e
+    except PasswordHasherBusy:
+        db.rollback()
+        raise hashing_unavailable()
     except Exception as e:
         print(e)
         db.rollback()
@@ -198,6 +227,7 @@ def signout(user=Depends(get_current_user),db: Session = Depends(get_db)):
         if existing_user:
             existing_user.refresh_token = None
             db.commit()
+        auth_cache.invalidate_user(user['email'])
 
         response = JSONResponse(
             status_code=200,
@@ -3,14 +3,11 @@ from sqlalchemy.orm import Session
 from fastapi.responses import JSONResponse
 from app.db import get_db
 from app.middleware import get_current_user
-from app.db import SessionLocal
 from app.models import Chat,Reports,Patient
-from app.lib import client,get_query_prompt
+from app.lib import get_qdrant,get_query_prompt
 from app.ocr import llm_class
 import json
 
-db=SessionLocal()
-
 router=APIRouter(prefix="/chat")
 
 # @router.post("/session")
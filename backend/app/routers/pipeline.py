@@ -0,0 +1,44 @@
+from fastapi import APIRouter,Depends, HTTPException
+from rq import Queue, Worker
+from app.middleware import get_current_user
+from app.lib.redis import r
+from app.db import identity_map_stats
+from app.lib import auth_cache
+from app.ocr import ocr_cache, extraction_cache
+
+router=APIRouter(prefix="/pipeline")
+
+# in pipeline order, report_tasks only holds jobs enqueued before the pipeline was split
+STAGE_QUEUES = ["report_ocr", "report_extract", "report_persist", "raw_data_vectorization", "report_tasks"]
+
+def queue_status(queue: Queue):
+    return {
+        "queued": queue.count,
+        "started": queue.started_job_registry.count,
+        "scheduled": queue.scheduled_job_registry.count,
+        "deferred": queue.deferred_job_registry.count,
+        "failed": queue.failed_job_registry.count,
+        "finished": queue.finished_job_registry.count,
+        "workers": Worker.count(queue=queue),
+    }
+
+@router.get("/status")
+def get_pipeline_status(user=Depends(get_current_user)):
+    # imported here so the API doesn't load numpy and the query encoder at startup
+    from app.lib.answer_cache import answer_cache
+    try:
+        return {
+            "stages": {name: queue_status(Queue(name, connection=r)) for name in STAGE_QUEUES},
+            "caches": {
+                "ocr": ocr_cache.stats(),
+                "extraction": extraction_cache.stats(),
+                "answers": answer_cache.stats(),
+                # this API process only
+                "auth": auth_cache.stats(),
+            },
+            # sessions closed by this API process, per scope
+            "db_sessions": identity_map_stats(),
+        }
+    except Exception as e:
+        print(f"Pipeline Status Error: {e}")
+        raise HTTPException(status_code=500, detail="Something went wrong while fetching pipeline status")
\ No newline at end of file
@@ -1,39 +1,80 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException,Depends,Form
+from fastapi import APIRouter, File, UploadFile, HTTPException,Depends,Form,Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse,StreamingResponse
-import shutil
 from app.lib import BASE_URL
 import uuid
+import hashlib
+import os
 from app.middleware import get_current_user
-from app.db import SessionLocal
-from app.models import Reports,SpecimenValidity,ReportMetaData,TestResults,ScreeningTests,ConfirmationTests,ReportedMedications,ReportsMedia, Chat,AISummary,Patient
-from app.lib import client,get_query_prompt,summarization_prompt
+from app.db import SessionLocal,get_async_db
+from app.models import Reports,SpecimenValidity,ReportMetaData,TestResults,ScreeningTests,ConfirmationTests,ReportedMedications,ReportsMedia, Chat,AISummary,Patient,resolve_context_async
+from app.lib import get_qdrant,get_query_prompt,summarization_prompt
+from app.lib.constants import ANSWER_CACHE_ENABLED, UPLOAD_CHUNK_SIZE, UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_REQUEST_BYTES
 from app.ocr import llm_class
 from app.schemas import ReportResponse
 import json
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 # from toon_python import encode
 
-MAPPINGS = {
-    "specimen_validity":SpecimenValidity,
-    "report_metadata":ReportMetaData,
-    "test_results":TestResults,
-    "screening_tests":ScreeningTests,
-    "confirmation_tests":ConfirmationTests,
-    "reported_medications":ReportedMedications
-}
-
-db=SessionLocal()
-
 router=APIRouter(prefix="/report")
 
 allowed_extensions = ['jpeg','jpg','png']
 
+def too_large(detail: str):
+    return HTTPException(status_code=413, detail=detail)
+
+def write_chunk(buffer, hasher, chunk: bytes):
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+async def stream_upload(file: UploadFile, file_location: str, budget: int):
+    """
+    Copies `file` to `file_location` chunk by chunk, hashing as it goes. Disk writes run in the
+    threadpool. Stops with a 413 as soon as the file passes UPLOAD_MAX_FILE_BYTES or the
+    `budget` left for the request. Returns (sha256 hex digest, bytes written).
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = await run_in_threadpool(open, file_location, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > UPLOAD_MAX_FILE_BYTES:
+                raise too_large(f"{file.filename} is larger than {UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB")
+            if size > budget:
+                raise too_large(f"Upload is larger than {UPLOAD_MAX_REQUEST_BYTES // (1024 * 1024)} MB")
+            await run_in_threadpool(write_chunk, buffer, hasher, chunk)
+    finally:
+        await run_in_threadpool(buffer.close)
+    return hasher.hexdigest(), size
+
+def remove_files(paths: list[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+async def existing_media_urls(db: AsyncSession, patient_id: int, hashes: list[str]):
+    """content_hash -> url of media the patient already has, in reports that were not deleted."""
+    rows = await db.execute(
+        select(ReportsMedia.content_hash, ReportsMedia.url)
+        .join(Reports, Reports.id == ReportsMedia.report_id)
+        .where(Reports.patient_id == patient_id, Reports.deleted == False, ReportsMedia.content_hash.in_(hashes))
+    )
+    return {content_hash: url for content_hash, url in rows}
+
 @router.post("/upload")
 async def upload_files(
     patient_id: int = Form(...),
     files: list[UploadFile] = File(...),
-    user=Depends(get_current_user)
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    written_files = []
     try:
         user_id = user["id"]
 
@@ -53,34 +94,60 @@ async def upload_files(
                     detail=f"{file.filename} has an invalid extension. Allowed file types are {', '.join(allowed_extensions)}",
                     status_code=400
                 )
+            # the spooled size is known up front for multipart uploads, reject before copying anything
+            if file.size is not None and file.size > UPLOAD_MAX_FILE_BYTES:
+                raise too_large(f"{file.filename} is larger than {UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB")
 
-        uploaded_file_locations = []
+        if sum(file.size or 0 for file in files) > UPLOAD_MAX_REQUEST_BYTES:
+            raise too_large(f"Upload is larger than {UPLOAD_MAX_REQUEST_BYTES // (1024 * 1024)} MB")
 
-        patient = Patient.get_by_id_and_creator(db=db, creator_id=user_id, patient_id=patient_id)
+        patient = await db.scalar(select(Patient).where(Patient.id == patient_id, Patient.creator_id == user_id))
 
         if patient is None:
             raise HTTPException(detail="Patient Not found", status_code=404)
 
-        report = Reports(patient_id=patient_id)
-        db.add(report)
-        db.commit()
-        db.flush()
-
+        uploads = []
+        budget = UPLOAD_MAX_REQUEST_BYTES
         for file in files:
             ext = "." + file.filename.split(".")[-1].lower().strip()
             final_name = f"{uuid.uuid4()}{ext}"
 
             file_location = f"public/uploads/{final_name}"
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            uploaded_file_locations.append(BASE_URL + "uploads/" + final_name)
-
-        ReportsMedia.bulk_create(db=db, report_id=report.id, urls=uploaded_file_locations)
+            written_files.append(file_location)
+            digest, size = await stream_upload(file, file_location, budget)
+            budget -= size
+
+            uploads.append((digest, file_location, BASE_URL + "uploads/" + final_name))
+
+        # identical content is linked to the file the patient already has (or to the first copy
+        # in this upload), so it is stored once and its OCR text comes from the cache
+        known_urls = await existing_media_urls(db, patient_id, list({digest for digest, _, _ in uploads}))
+        media = []
+        duplicates = []
+        for digest, file_location, url in uploads:
+            if digest in known_urls:
+                duplicates.append(file_location)
+            else:
+                known_urls[digest] = url
+            media.append((digest, known_urls[digest]))
+
+        # report, media and the scheduler NOTIFY are committed together
+        report = Reports(patient_id=patient_id)
+        db.add(report)
+        await db.flush()
+        db.add_all([ReportsMedia(report_id=report.id, url=url, content_hash=digest) for digest, url in media])
+        await db.execute(Reports.notify_statement(report.id))
+        await db.commit()
+        # committed files are referenced now, only the duplicate copies may be removed
+        written_files = duplicates
+        await run_in_threadpool(remove_files, duplicates)
 
     except HTTPException as e:
+        await run_in_threadpool(remove_files, written_files)
         raise e
     except Exception as e:
+        await db.rollback()
+        await run_in_threadpool(remove_files, written_files)
         print("Error occurred while uploading reports", e)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
@@ -89,42 +156,75 @@ async def upload_files(
         content={"message": "Report Uploaded Successfully"}
     )
 
+async def get_searchable_report(db: AsyncSession,user_id:int,patient_id:int,report_id:int):
+    patient = await db.scalar(select(Patient).where(Patient.creator_id == int(user_id), Patient.id == patient_id))
+    if not patient:
+        raise HTTPException(status_code=400, detail="Patient Not Found")
+    # the report itself must belong to this patient, report_id is used for the answer cache and the search filter
+    report = await db.scalar(select(Reports).where(Reports.id==report_id,Reports.patient_id==patient.id,Reports.deleted==False,Reports.error==False,Reports.data_extracted==True))
+    if not report:
+        raise HTTPException(status_code=400, detail="Report Not Found")
+    return report
+
 @router.get("/search")
-async def query_reports(query: str,patient_id:int,report_id:int,user=Depends(get_current_user)):
+async def query_reports(request: Request,query: str,patient_id:int,report_id:int,user=Depends(get_current_user),db: AsyncSession = Depends(get_async_db)):
+    # the answer cache pulls in numpy and the query encoder, only loaded once a search comes in
+    from app.lib.answer_cache import answer_cache, replay_tokens
     user_id=user["id"]
     patient_id = patient_id
     report_id = report_id
 
     try:
-        with SessionLocal() as db:
-            patient = db.query(Patient).filter(Patient.creator_id == int(user_id), Patient.id == patient_id).first()
-            if not patient:
-                raise HTTPException(status_code=400, detail="Patient Not Found")
-            report = db.query(Reports).filter(Reports.patient_id==patient_id,Reports.deleted==False,Reports.error==False,Reports.data_extracted==True).first()
-            if not report:
-                raise HTTPException(status_code=400, detail="Report Not Found")
-
-
-        points = client.similarity_search_collection1(query_str=query,top_k=10,report_id=report_id)
+        await get_searchable_report(db, user_id, patient_id, report_id)
+        # streamed responses keep the session open until the body is done, so every read
+        # transaction is ended right away instead of holding a pooled connection idle in transaction
+        await db.rollback()
+
+        started = time.perf_counter()
+        query_vector = None
+        if ANSWER_CACHE_ENABLED:
+            cached_answer, _, query_vector = await run_in_threadpool(answer_cache.lookup, report_id, user_id, query)
+            if cached_answer is not None:
+                async def replay():
+                    for token in replay_tokens(cached_answer):
+                        yield f"data: {json.dumps({'token': token})}\n\n"
+                    yield "event: end\ndata: [DONE]\n\n"
+                return StreamingResponse(replay(), media_type="text/event-stream")
+
+        # the first call in a process connects and bootstraps the collections, keep that off the loop
+        qdrant = await run_in_threadpool(get_qdrant)
+        points = await qdrant.similarity_search_collection1_async(query_str=query,top_k=10,report_id=report_id,user_id=user_id)
         context = []
         response_buffer = []
 
         if points is not None:
             payloads = [p.payload for p in points]
-            for data in payloads:
-                with SessionLocal() as db:
-                    context.append(MAPPINGS.get(data.get("collection_name")).get_by_id(db=db,id=data.get("collection_id")))
+            context = await resolve_context_async(payloads=payloads, db=db)
+            await db.rollback()
 
         llm_instance = llm_class(prompt=get_query_prompt(), report_data=None)
-        def generate():
-            for token in llm_instance.call_llm_stream(query, q_context=context):
-                response_buffer.append(token)
-                yield f"data: {json.dumps({'token': token})}\n\n"
-            # full_response = "".join(response_buffer)
-            yield "event: end\ndata: [DONE]\n\n"
+        async def generate():
+            stream = llm_instance.call_llm_astream(query, q_context=context)
+            try:
+                async for token in stream:
+                    # stop pulling tokens from the LLM as soon as the client goes away
+                    if await request.is_disconnected():
+                        break
+                    response_buffer.append(token)
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+                else:
+                    yield "event: end\ndata: [DONE]\n\n"
+                    if ANSWER_CACHE_ENABLED:
+                        full_response = "".join(response_buffer)
+                        latency_ms = (time.perf_counter() - started) * 1000
+                        await run_in_threadpool(answer_cache.store, report_id, user_id, query, full_response, latency_ms, query_vector)
+            finally:
+                await stream.aclose()
 
         return StreamingResponse(generate(), media_type="text/event-stream")
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("Stream error:", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -135,6 +235,8 @@ async def delete_report(report_id:str,user=Depends(get_current_user)):
         with SessionLocal() as db:
             deleted = Reports.delete(db=db,id=report_id,user_id=user["id"])
             if deleted:
+                from app.lib.answer_cache import answer_cache
+                answer_cache.invalidate(deleted.id)
                 return JSONResponse(status_code=200,content={"message":"Report Deleted Successfully"})
         return HTTPException(status_code=400, detail="Invalid Report Id")
     except HTTPException as e:
@@ -143,38 +245,37 @@ async def delete_report(report_id:str,user=Depends(get_current_user)):
         print("Error Occured while deleting report", e)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-@router.get("/summarise/{report_id}/{patient_id}")
-async def summarise_report(report_id:int, patient_id:int, user=Depends(get_current_user)):
-    try:
-        report = None
-        with SessionLocal() as db:
+async def get_summarisable_report(db: AsyncSession, user_id: int, report_id: int, patient_id: int):
+    patient = await db.scalar(select(Patient).where(Patient.id==patient_id,Patient.creator_id==user_id))
+    if patient is None:
+        raise HTTPException(status_code=404,detail='Patient Not Found')
 
-            patient = db.query(Patient).filter(Patient.id==patient_id,Patient.creator_id==user['id'])
+    report = await db.scalar(select(Reports).where(Reports.id == report_id, Reports.patient_id == patient_id,Reports.deleted==False,Reports.error==False,Reports.data_extracted==True))
+    if not report:
+        raise HTTPException(status_code=404,detail="Report not found")
+    return report
 
-            if patient is None:
-                raise HTTPException(status_code=404,detail='Patient Not Found')
-            
-            report = (db.query(Reports).filter(Reports.id == report_id, Reports.patient_id == patient_id,Reports.deleted==False,Reports.error==False,Reports.data_extracted==True).first())
+@router.get("/summarise/{report_id}/{patient_id}")
+async def summarise_report(report_id:int, patient_id:int, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    try:
+        report = await get_summarisable_report(db, user['id'], report_id, patient_id)
 
-        if not report:
-            raise HTTPException(status_code=404,detail="Report not found")
-        if report:
-            report_metadata = (db.query(ReportMetaData).filter(ReportMetaData.report_id == report_id).first())
+        report_metadata = await db.scalar(select(ReportMetaData).where(ReportMetaData.report_id == report_id).limit(1))
         if not report_metadata or not report_metadata.raw_ocr_text:
             raise HTTPException(status_code=404,detail="Nothing to summarize")
 
-        with SessionLocal() as db:
-            result_set = (db.query(AISummary).filter(AISummary.report_id == report.id).first())
+        result_set = await db.scalar(select(AISummary).where(AISummary.report_id == report.id).limit(1))
         if result_set and result_set.summary:
             raise HTTPException(status_code=400,detail="Already Summarised")
 
+        summary_report_id = report.id
         llm_instance = llm_class(prompt=summarization_prompt(), raw_ocr_text=report_metadata.raw_ocr_text)
-        response=llm_instance.call_llm()
-        with SessionLocal() as db:
-            summarised = AISummary(summary=response,report_id=report.id)
-            db.add(summarised)
-            db.commit()
-            db.flush()
+        # ends the read transaction so the pooled connection isn't held for the whole LLM call
+        await db.rollback()
+        # the LLM call blocks, keep it off the event loop
+        response = await run_in_threadpool(llm_instance.call_llm)
+        db.add(AISummary(summary=response,report_id=summary_report_id))
+        await db.commit()
         return JSONResponse(content={'summary':response})
     except HTTPException as e:
         raise e
@@ -183,20 +284,11 @@ async def summarise_report(report_id:int, patient_id:int, user=Depends(get_curre
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 @router.get("/aisummary/{report_id}/{patient_id}")
-async def summarise_report(report_id:int, patient_id:int,user=Depends(get_current_user)):
+async def summarise_report(report_id:int, patient_id:int,user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     try:
-        report = None
-        with SessionLocal() as db:
-            patient = db.query(Patient).filter(Patient.id==patient_id,Patient.creator_id==user['id'])
-            if patient is None:
-                raise HTTPException(status_code=404,detail='Patient Not Found')
-
-            report = (db.query(Reports).filter(Reports.id == report_id, Reports.patient_id == patient_id,Reports.deleted==False,Reports.error==False,Reports.data_extracted==True).first())
+        await get_summarisable_report(db, user['id'], report_id, patient_id)
 
-        if not report:
-            raise HTTPException(status_code=404,detail="Report not found")
-        with SessionLocal() as db:
-            result_set = (db.query(AISummary).filter(AISummary.report_id == report_id).first())
+        result_set = await db.scalar(select(AISummary).where(AISummary.report_id == report_id).limit(1))
         
         if not result_set:
             raise HTTPException(status_code=404,detail="Summary Not Found")
@@ -210,33 +302,33 @@ async def summarise_report(report_id:int, patient_id:int,user=Depends(get_curren
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 @router.get("/{report_id}/{patient_id}", response_model=ReportResponse,response_model_exclude_none=True)
-async def get_report(report_id: int,patient_id:int, user=Depends(get_current_user)):
+async def get_report(report_id: int,patient_id:int, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     try:
-        with SessionLocal() as db:
-            patient = db.query(Patient.creator_id == user["id"])
-
-            if not patient:
-                raise HTTPException(status_code=404, detail="Patient Not Found") 
-
-            report = (
-                db.query(Reports)
-                .options(
-                    joinedload(Reports.report_metadata),
-                    joinedload(Reports.test_results),
-                    joinedload(Reports.specimen_validity),
-                    joinedload(Reports.reports_media),
-                    joinedload(Reports.screening_tests),
-                    joinedload(Reports.confirmation_tests),
-                    joinedload(Reports.medications),
-                )
-                .filter(
-                    Reports.id == report_id,
-                    Reports.deleted == False,
-                    Reports.patient_id == patient_id,
-                    Reports.error==False,Reports.data_extracted==True
-                )
-                .first()
+        patient = await db.scalar(select(Patient).where(Patient.id == patient_id, Patient.creator_id == user["id"]))
+
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient Not Found") 
+
+        # every relationship the response model reads is loaded here, async sessions can't lazy load
+        result = await db.execute(
+            select(Reports)
+            .options(
+                joinedload(Reports.report_metadata),
+                joinedload(Reports.test_results),
+                joinedload(Reports.specimen_validity),
+                joinedload(Reports.reports_media),
+                joinedload(Reports.screening_tests),
+                joinedload(Reports.confirmation_tests),
+                joinedload(Reports.medications),
+            )
+            .where(
+                Reports.id == report_id,
+                Reports.deleted == False,
+                Reports.patient_id == patient_id,
+                Reports.error==False,Reports.data_extracted==True
             )
+        )
+        report = result.unique().scalars().first()
 
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
@@ -1,5 +1,4 @@
 
-from app.db import SessionLocal
 from fastapi import APIRouter,Depends,HTTPException
 from sqlalchemy.orm import Session
 from app.middleware import get_current_user
@@ -21,8 +20,6 @@ class TrendResponse(BaseModel):
     test_name: str
     trends: List[TrendDataPoint]
 
-db=SessionLocal()
-
 router=APIRouter(prefix="/trends")
 
 @router.get("/",response_model=TrendResponse)
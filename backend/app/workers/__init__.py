@@ -1,3 +1,18 @@
-from .redis_workers import process_reports
-from .vector_db_workers import vectorize_raw_report_data
-from .email_workers import send_email
\ No newline at end of file
+# Job functions are imported on first access so that importing one of them (e.g. send_email
+# in the API) doesn't pull in the OCR and embedding stacks of the others.
+_JOBS = {
+    "process_reports": "app.workers.redis_workers",
+    "process_report": "app.workers.redis_workers",
+    "enqueue_report": "app.workers.redis_workers",
+    "ocr_report": "app.workers.redis_workers",
+    "extract_report": "app.workers.redis_workers",
+    "persist_report": "app.workers.redis_workers",
+    "vectorize_raw_report_data": "app.workers.vector_db_workers",
+    "send_email": "app.workers.email_workers",
+}
+
+def __getattr__(name):
+    if name in _JOBS:
+        import importlib
+        return getattr(importlib.import_module(_JOBS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,17 @@
+# Runs inside the password hashing pool's processes (see app/lib/password_hasher.py). Keep the
+# imports to passlib: a child that imported app.lib would load langchain, redis and the rest.
+import os
+import time
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def hash_password(password: str):
+    return pwd_context.hash(password)
+
+def verify_password(password: str, hashed: str):
+    return pwd_context.verify(password, hashed)
+
+def ping(delay: float):
+    time.sleep(delay)
+    return os.getpid()
\ No newline at end of file
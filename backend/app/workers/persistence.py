@@ -0,0 +1,130 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models import ReportMetaData, SpecimenValidity, TestResults, ScreeningTests, ConfirmationTests, ReportedMedications
+
+def serialize_model(obj):
+    """Converts SQLAlchemy model instance or dict to JSON-safe dict"""
+    if isinstance(obj, dict):
+        data = obj
+    else:
+        data = obj.__dict__.copy()
+        data.pop("_sa_instance_state", None)
+
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+    return data
+
+def base_template(collection_name,collection_id,data):
+    return {
+            "name":collection_name,
+            "collection_id":collection_id,
+            "data":data
+    }
+
+def _field(data: dict, key: str, field: str):
+    return (data.get(key) or {}).get(field, None)
+
+def metadata_rows(report_id: int, report_metadata: dict, raw_text: str):
+    report_metadata = report_metadata or {}
+    return [{
+        "patient_name": report_metadata.get('patient_name',None),
+        "patient_age": report_metadata.get('patient_age',None),
+        "patient_gender": report_metadata.get('patient_gender',None),
+        "report_type": report_metadata.get('report_type',None),
+        "accession_number": report_metadata.get('accession_number',None),
+        "collection_date": report_metadata.get('collection_date',None),
+        "received_date": report_metadata.get('received_date',None),
+        "sample_type": report_metadata.get('sample_type',None),
+        "lab_name": report_metadata.get('lab_name',None),
+        "lab_director": report_metadata.get('lab_director',None),
+        "clia_number": report_metadata.get('clia_number',None),
+        "report_date": report_metadata.get('report_date',None),
+        "cap_number": report_metadata.get('cap_number',None),
+        "notes": report_metadata.get('notes',None),
+        "report_id": report_id,
+        "raw_ocr_text": raw_text,
+    }]
+
+def specimen_validity_rows(report_id: int, specimen_validity: dict):
+    specimen_validity = specimen_validity or {}
+    return [{
+        "specific_gravity": _field(specimen_validity, "specific_gravity", "value"),
+        "specific_gravity_status": _field(specimen_validity, "specific_gravity", "status"),
+        "ph_level": _field(specimen_validity, "ph", "value"),
+        "ph_status": _field(specimen_validity, "ph", "status"),
+        "creatinine": _field(specimen_validity, "creatinine", "value"),
+        "creatinine_unit": _field(specimen_validity, "creatinine", "unit"),
+        "creatinine_status": _field(specimen_validity, "creatinine", "status"),
+        "oxidants": _field(specimen_validity, "oxidants", "value"),
+        "oxidants_status": _field(specimen_validity, "oxidants", "status"),
+        "is_valid": specimen_validity.get("overall_validity",None),
+        "report_id": report_id,
+    }]
+
+def test_result_rows(report_id: int, test_results: list):
+    return [{
+        "report_id": report_id,
+        "test_name": test.get('test_name',None),
+        "test_category": test.get('test_category',None),
+        "outcome": test.get('outcome',None),
+        "result_value": test.get('result_value',None),
+        "result_numeric": test.get('result_numeric',None),
+        "unit": test.get('unit',None),
+        "cutoff_value": test.get('cutoff_value',None),
+        "reference_range": test.get('reference_range',None),
+        "is_abnormal": test.get('is_abnormal',None),
+        "is_critical": test.get('is_critical',None),
+    } for test in test_results or []]
+
+def screening_test_rows(report_id: int, screening_tests: list):
+    return [{
+        "report_id": report_id,
+        "test_name": test.get("test_name",None),
+        "outcome": test.get("outcome",None),
+        "result_value": test.get("result_value",None),
+        "cutoff_value": test.get("cutoff_value",None),
+    } for test in screening_tests or []]
+
+def confirmation_test_rows(report_id: int, confirmation_analysis: list):
+    return [{
+        "report_id": report_id,
+        "test_name": test.get("test_name",None),
+        "method": test.get("method",None),
+        "outcome": test.get("outcome",None),
+        "result_value": test.get("result_value",None),
+        "result_numeric": test.get("result_numeric",None),
+        "unit": test.get("unit",None),
+        "cutoff_value": test.get("cutoff_value",None),
+        "detection_window": test.get("detection_window",None),
+    } for test in confirmation_analysis or []]
+
+def medication_rows(report_id: int, reported_medications: list):
+    return [{
+        "report_id": report_id,
+        "medication_name": medication.get("medication_name",None),
+        "is_tested": medication.get("is_tested",None),
+    } for medication in reported_medications or []]
+
+def persist_report_entities(db: Session, report_id: int, cleaned_report: dict, raw_text: str):
+    """
+    Inserts every entity extracted from one report with one multi-row INSERT ... RETURNING per table.
+    Nothing is committed here, the caller commits the whole report as a single transaction.
+    Returns the entries to vectorize, in the same order the per-row inserts used to produce them.
+    """
+    entities = [
+        ("report_metadata", ReportMetaData, metadata_rows(report_id, cleaned_report.get("report_metadata"), raw_text)),
+        ("specimen_validity", SpecimenValidity, specimen_validity_rows(report_id, cleaned_report.get("specimen_validity"))),
+        ("test_results", TestResults, test_result_rows(report_id, cleaned_report.get("test_results"))),
+        ("screening_tests", ScreeningTests, screening_test_rows(report_id, cleaned_report.get("screening_tests"))),
+        ("confirmation_tests", ConfirmationTests, confirmation_test_rows(report_id, cleaned_report.get("confirmation_analysis"))),
+        ("reported_medications", ReportedMedications, medication_rows(report_id, cleaned_report.get("reported_medications"))),
+    ]
+
+    data_to_vectorize = []
+    for collection_name, model, rows in entities:
+        for clean_dict, id in model.bulk_create(session=db, rows=rows):
+            data_to_vectorize.append(
+                base_template(collection_id=id, collection_name=collection_name, data=serialize_model(clean_dict))
+            )
+    return data_to_vectorize
@@ -0,0 +1,149 @@
+"""
+Preforking launcher for the RQ workers.
+
+The parent loads the job modules, the OCR engines and the embedding models once and then
+forks long-lived children. Each child runs an rq SimpleWorker, which executes jobs in the
+child itself instead of forking a work-horse per job, so every job finds the models already
+loaded and the model pages stay shared copy-on-write with the parent.
+Dead children are replaced, and the RSS/PSS of every child is logged periodically.
+
+    python -m app.workers.start --concurrency report_ocr=4 --concurrency report_extract=8
+"""
+import os
+
+# native thread pools don't survive fork, so models loaded before the fork have to run
+# single threaded in the children (parallelism comes from the number of children instead)
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("EMBED_THREADS", "1")
+
+import gc
+import signal
+import time
+from app.lib.create_logging import get_logger
+
+logger = get_logger("prefork", "prefork.log")
+
+OCR_QUEUES = ("report_tasks", "report_ocr")
+EMBEDDING_QUEUES = ("raw_data_vectorization",)
+REPORT_QUEUES = ("report_tasks", "report_ocr", "report_extract", "report_persist")
+RSS_LOG_INTERVAL = 60
+
+def preload(queues):
+    """Loads everything the children need before forking."""
+    import app.workers.redis_workers
+    import app.workers.vector_db_workers
+    import app.workers.email_workers
+
+    if any(q in OCR_QUEUES for q in queues):
+        from app.ocr import ocr_pool
+        ocr_pool.warm_up()
+    if any(q in EMBEDDING_QUEUES for q in queues):
+        from app.lib import get_dense_embedder, get_sparse_embedder
+        get_dense_embedder()
+        get_sparse_embedder()
+
+    # objects created so far are moved out of the GC's reach, otherwise the first collection
+    # in every child touches (and so copies) all of their pages
+    gc.collect()
+    gc.freeze()
+
+def memory_of(pid: int):
+    """RSS, PSS and shared/private kB of a process, from /proc (Linux only)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+def run_child(queue: str):
+    from rq import SimpleWorker
+    from app.db import engine
+    from app.lib.redis import r
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # pooled DB connections belong to the parent, the child opens its own
+    engine.dispose(close=False)
+
+    worker = SimpleWorker([queue], connection=r)
+    # the scheduler moves retried report jobs back into the queue once their backoff is over
+    worker.work(with_scheduler=queue in REPORT_QUEUES)
+
+class PreforkSupervisor:
+    def __init__(self, concurrency: dict[str, int]):
+        self.concurrency = {queue: count for queue, count in concurrency.items() if count > 0}
+        self.children = {}
+        self.stopping = False
+
+    def spawn(self, queue: str):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_child(queue)
+            except Exception:
+                logger.exception(f"Worker for {queue} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = queue
+        logger.info(f"Started worker pid={pid} queue={queue}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                # SIGTERM is a warm shutdown for rq, the current job is finished first
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def log_memory(self):
+        parent = memory_of(os.getpid())
+        logger.info(f"parent pid={os.getpid()} {parent}")
+        for pid, queue in self.children.items():
+            logger.info(f"child pid={pid} queue={queue} {memory_of(pid)}")
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            queue = self.children.pop(pid, None)
+            if queue is None:
+                continue
+            logger.warning(f"Worker pid={pid} queue={queue} exited with status {status}")
+            if not self.stopping:
+                self.spawn(queue)
+
+    def run(self):
+        preload(self.concurrency)
+        logger.info(f"Models loaded, parent memory {memory_of(os.getpid())}")
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for queue, count in self.concurrency.items():
+            for _ in range(count):
+                self.spawn(queue)
+
+        last_log = 0.0
+        while self.children:
+            self.reap()
+            if not self.stopping and time.monotonic() - last_log >= RSS_LOG_INTERVAL:
+                self.log_memory()
+                last_log = time.monotonic()
+            time.sleep(1)
+        logger.info("All workers stopped")
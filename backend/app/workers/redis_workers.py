@@ -1,195 +1,261 @@
-from app.db import SessionLocal
-from app.models import ConfirmationTests, Reports
-from app.ocr import preprocess_image,text_extraction,llm_class
-from app.models import ReportMetaData, SpecimenValidity, TestResults, ScreeningTests,ReportedMedications, ConfirmationTests
-from app.lib import raw_data_vectorization,get_extraction_prompt,get_logger
+import json
+from app.db import job_session
+from app.models import Reports
+from app.ocr import preprocess_page,batch_text_extraction,llm_class,ocr_pool,ocr_cache,content_hash,read_image_bytes
+from app.lib import ocr_queue,extract_queue,persist_queue,raw_data_vectorization,get_extraction_prompt,get_logger,answer_cache
+from app.lib.redis import r
+from app.lib.constants import OCR_CACHE_ENABLED, REPORT_JOB_RETRIES, REPORT_JOB_RETRY_INTERVALS, REPORT_JOB_TIMEOUT, REPORT_STAGE_TTL
 from app.workers.vector_db_workers import vectorize_raw_report_data
-from datetime import datetime
+from app.workers.persistence import persist_report_entities
 from app.models import ReportsMedia
+from rq import Retry, get_current_job
+from rq.job import Job, JobStatus
+from rq.exceptions import NoSuchJobError
 
-db=SessionLocal()
 logger = get_logger("redis_worker", "redis_worker.log")
 
-def serialize_model(obj):
-    """Converts SQLAlchemy model instance or dict to JSON-safe dict"""
-    if isinstance(obj, dict):
-        data = obj
-    else:
-        data = obj.__dict__.copy()
-        data.pop("_sa_instance_state", None)
-
-    for key, value in data.items():
-        if isinstance(value, datetime):
-            data[key] = value.isoformat()
-    return data
-
-def base_template(collection_name,collection_id,data):
-    return {
-            "name":collection_name,
-            "collection_id":collection_id,
-            "data":data
-    }
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED, JobStatus.SCHEDULED)
 
-def process_reports(report_ids: list[int]):
+def get_report_medias(db, report_id: int):
+    return (
+        db.query(ReportsMedia)
+        .filter(ReportsMedia.report_id == report_id)
+        .order_by(ReportsMedia.id.asc())
+        .all()
+    )
+
+def extract_report_pages(medias_by_report: dict[int, list]) -> dict[int, list[str]]:
+    """
+    OCRs the pages of one or more reports through batched predict calls.
+    Pages whose bytes were already OCRed with the current config come from ocr_cache.
+    Returns the text of every page keyed by report id, in media order.
+    """
+    page_texts = {rid: [None] * len(medias) for rid, medias in medias_by_report.items()}
+    pending = []
+    for rid, medias in medias_by_report.items():
+        for idx, media in enumerate(medias):
+            # the digest stored at upload time saves reading the file when its text is cached
+            data = None
+            digest = media.content_hash
+            if digest is None:
+                data = read_image_bytes(media.url)
+                digest = content_hash(data)
+            if OCR_CACHE_ENABLED:
+                cached = ocr_cache.get(digest)
+                if cached is not None:
+                    page_texts[rid][idx] = cached
+                    continue
+            if data is None:
+                data = read_image_bytes(media.url)
+            page, stats = preprocess_page(img_src=media.url, data=data)
+            logger.info(f"Report id -> {rid}. Preprocessed page {stats}")
+            pending.append((rid, idx, digest, page))
+
+    if pending:
+        with ocr_pool.engine() as engine:
+            texts = batch_text_extraction(imgs=[page for _, _, _, page in pending], engine=engine)
+        for (rid, idx, digest, _), text in zip(pending, texts):
+            page_texts[rid][idx] = text
+            if OCR_CACHE_ENABLED:
+                ocr_cache.set(digest, text)
+
+    logger.info(f"OCR cache {ocr_cache.stats()}")
+    return page_texts
+
+STAGES = ("ocr", "extract", "persist")
+
+def report_job_id(report_id: int, stage: str = None):
+    return f"report:{report_id}" if stage is None else f"report:{report_id}:{stage}"
+
+def _stage_key(report_id: int, stage: str):
+    return f"report_pipeline:{report_id}:{stage}"
+
+def save_stage_result(report_id: int, stage: str, result):
+    """Hands a stage's output to the next stage through Redis, dropped after REPORT_STAGE_TTL."""
+    r.set(_stage_key(report_id, stage), json.dumps(result), ex=REPORT_STAGE_TTL)
+
+def load_stage_result(report_id: int, stage: str):
+    raw = r.get(_stage_key(report_id, stage))
+    if raw is None:
+        raise RuntimeError(f"Output of the {stage} stage is missing (expired?), re-upload or re-enqueue the report")
+    return json.loads(raw)
+
+def clear_stage_results(report_id: int):
+    r.delete(*[_stage_key(report_id, stage) for stage in STAGES])
+
+def _active_job(job_id: str):
     try:
-        for rid in report_ids:
-            report = Reports.get_report(db=db, id=rid)
-
-            if not report:
-                continue
-
-            report_medias = db.query(ReportsMedia).filter(ReportsMedia.report_id == rid).all()
-
-            if not report_medias or len(report_medias) == 0:
-                continue
-
-            raw_text = ""
-
-            for r in report_medias:
-                report_src=r.url
-                img=preprocess_image(img_src=report_src)
-                raw_text+=text_extraction(img=img)
-
-            llm = llm_class(report_data=raw_text,prompt=get_extraction_prompt())
-            llm.set_report_id(rid)
-            cleaned_report = llm.call_llm()
-
-            report_metadata = cleaned_report["report_metadata"]
-            specimen_validity = cleaned_report["specimen_validity"]
-
-            test_results = cleaned_report["test_results"]
-            screening_tests = cleaned_report["screening_tests"] 
-            confirmation_analysis = cleaned_report["confirmation_analysis"] 
-            reported_medications = cleaned_report["reported_medications"]
-
-            data_to_vectorize = []
-
-
-            print(raw_text)
-
-            # creating metadata     
-            report_metadata,id = ReportMetaData.create(
-                session=db,
-                patient_name=report_metadata.get('patient_name',None),
-                patient_age=report_metadata.get('patient_age',None),
-                patient_gender=report_metadata.get('patient_gender',None),
-                report_type=report_metadata.get('report_type',None),
-                accession_number=report_metadata.get('accession_number',None),
-                collection_date=report_metadata.get('collection_date',None),
-                received_date=report_metadata.get('received_date',None),
-                sample_type=report_metadata.get('sample_type',None),
-                lab_name=report_metadata.get('lab_name',None),
-                lab_director=report_metadata.get('lab_director',None),
-                clia_number=report_metadata.get('clia_number',None),
-                report_date=report_metadata.get('report_date',None),
-                cap_number=report_metadata.get('cap_number',None),
-                notes=report_metadata.get('notes',None),
-                report_id=report.id,
-                raw_ocr_text=raw_text
-            )
-
-            metadata = base_template(collection_id=id,collection_name="report_metadata",data=serialize_model(report_metadata))
-            data_to_vectorize.append(metadata)
-
-            specimen_validity_data,id = SpecimenValidity.create(
-                session=db,
-                specific_gravity=(specimen_validity.get("specific_gravity",None)).get("value",None),
-                specific_gravity_status=(specimen_validity.get("specific_gravity",None)).get("status",None),
-                ph_level=(specimen_validity.get("ph",None)).get("value",None),
-                ph_status=(specimen_validity.get("ph",None)).get("status",None),
-                creatinine=(specimen_validity.get("creatinine",None)).get("value",None),
-                creatinine_unit=(specimen_validity.get("creatinine",None)).get("unit",None),
-                creatinine_status=(specimen_validity.get("creatinine",None)).get("status",None),
-                oxidants=(specimen_validity.get("oxidants",None)).get("value",None),
-                oxidants_status=(specimen_validity.get("oxidants",None)).get("status",None),
-                is_valid=(specimen_validity.get("overall_validity",None)),
-                report_id=report.id
-            )
-
-            specimen_validity = base_template(collection_id=id,collection_name="specimen_validity",data=serialize_model(specimen_validity_data))
-
-            data_to_vectorize.append(specimen_validity)
-
-            for test in test_results:
-                test_results_data,id = TestResults.create(
-                    session=db,
-                    report_id=report.id,
-                    test_name=test.get('test_name',None),
-                    test_category=test.get('test_category',None),
-                    outcome=test.get('outcome',None),
-                    result_value=test.get('result_value',None),
-                    result_numeric=test.get('result_numeric',None),
-                    unit=test.get('unit',None),
-                    cutoff_value=test.get('cutoff_value',None),
-                    reference_range=test.get('reference_range',None),
-                    is_abnormal=test.get('is_abnormal',None),
-                    is_critical=test.get('is_critical',None),
-                )
-                test_res = base_template(collection_id=id,collection_name="test_results",data=serialize_model(test_results_data))
-
-                data_to_vectorize.append(test_res)
-
-            for test in screening_tests:
-                screening_tests_data,id = ScreeningTests.create(
-                    session=db,
-                    report_id=report.id,
-                    test_name=test.get("test_name",None),
-                    outcome=test.get("outcome",None),
-                    result_value=test.get("result_value",None),
-                    cutoff_value=test.get("cutoff_value",None),
-                )
-                screening_test_res = base_template(collection_id=id,collection_name="screening_tests",data=serialize_model(screening_tests_data))
-
-                data_to_vectorize.append(screening_test_res)
-
-            for test in confirmation_analysis:
-                confirmation_tests,id = ConfirmationTests.create(
-                    session=db,
-                    report_id=report.id,
-                    test_name=test.get("test_name",None),
-                    method=test.get("method",None),
-                    outcome=test.get("outcome",None),
-                    result_value=test.get("result_value",None),
-                    result_numeric=test.get("result_numeric",None),
-                    unit=test.get("unit",None),
-                    cutoff_value=test.get("cutoff_value",None),
-                    detection_window=test.get("detection_window",None),
-                )
-                confirmation_test_res = base_template(collection_id=id,collection_name="confirmation_tests",data=serialize_model(confirmation_tests))
-
-                data_to_vectorize.append(confirmation_test_res)
-
-            for medication in reported_medications:
-                reported_meds_data,id = ReportedMedications.create(
-                    session=db,
-                    report_id=report.id,
-                    medication_name=medication.get("medication_name",None),
-                    is_tested=medication.get("is_tested",None),
-                )
-                reported_meds = base_template(collection_id=id,collection_name="reported_medications",data=serialize_model(reported_meds_data))
-
-                data_to_vectorize.append(reported_meds)
-            
-            # # for collection1
-            raw_report_vectorize = {
-                "report_id":rid,
-                "patient_id":report.patient_id,
-                "data":data_to_vectorize
-            }
-            db.commit()
-
-            Reports.mark_completed(db=db,id=rid)
-            logger.info(f"Report id -> {rid}. Processed Successfully")
-            raw_data_vectorization.enqueue(vectorize_raw_report_data,raw_report_vectorize)
-    except Exception as e:
-            # 2. ROLLBACK IMMEDIATELY
+        job = Job.fetch(job_id, connection=r)
+    except NoSuchJobError:
+        return None
+    return job if job.get_status(refresh=False) in ACTIVE_JOB_STATUSES else None
+
+def _enqueue_stage(queue, func, report_id: int, stage: str):
+    return queue.enqueue(
+        func,
+        report_id,
+        job_id=report_job_id(report_id, stage),
+        job_timeout=REPORT_JOB_TIMEOUT,
+        retry=Retry(max=REPORT_JOB_RETRIES, interval=REPORT_JOB_RETRY_INTERVALS),
+    )
+
+def enqueue_report(report_id: int):
+    """
+    Starts the staged pipeline (report_ocr -> report_extract -> report_persist -> vectorization)
+    for one report. Every stage job has the id report:<id>:<stage>; while any of them, or a
+    legacy report:<id> job, is queued, running or waiting for a retry the active job is
+    returned instead, so a report is never processed twice at the same time.
+    """
+    for job_id in [report_job_id(report_id)] + [report_job_id(report_id, stage) for stage in STAGES]:
+        job = _active_job(job_id)
+        if job is not None:
+            logger.info(f"Report id -> {report_id}. Already has an active job {job_id}, not enqueued again")
+            return job
+    return _enqueue_stage(ocr_queue, ocr_report, report_id, "ocr")
+
+def enqueue_vectorization(report_id: int, payload: dict):
+    """Enqueues vectorization as report:<id>:vectorize, unless that job is already active."""
+    job_id = report_job_id(report_id, "vectorize")
+    job = _active_job(job_id)
+    if job is not None:
+        return job
+    return raw_data_vectorization.enqueue(vectorize_raw_report_data, payload, job_id=job_id)
+
+def resume_vectorization(db, rid: int):
+    """
+    A persist attempt can commit the report and then fail to enqueue vectorization. Its payload
+    is still in the persist stage result then, so the retry enqueues it from there.
+    """
+    raw = r.get(_stage_key(rid, "persist"))
+    if raw is None:
+        return
+    completed = db.query(Reports).filter(Reports.id == rid, Reports.deleted == False, Reports.error == False, Reports.data_extracted == True).first()
+    if completed:
+        logger.info(f"Report id -> {rid}. Already persisted, enqueueing its vectorization")
+        enqueue_vectorization(rid, json.loads(raw))
+    clear_stage_results(rid)
+
+def is_last_attempt():
+    job = get_current_job()
+    return job is None or not job.retries_left
+
+def run_stage(rid: int, stage: str, func):
+    """
+    Runs one stage of a report with a session of its own, closed when the stage ends.
+    A failure rolls back only this report and is raised so RQ retries the stage with
+    backoff; the report is marked as errored once no retries are left.
+    """
+    with job_session(stage) as db:
+        try:
+            return func(db, rid)
+        except Exception as e:
             db.rollback()
-            
-            # 3. USE LOGGER.EXCEPTION TO PRINT FULL STACK TRACE
-            logger.exception(f"Failed to process report ID: {rid}. Error: {str(e)}")
-            
-            # 4. WRAP ERROR MARKING IN ITS OWN TRY-CATCH
-            try:
-                Reports.mark_error(db=db, errormsg=str(e), id=rid)
-            except Exception as inner_e:
-                logger.error(f"FATAL: Could not mark report {rid} as error. Database issue: {inner_e}")
\ No newline at end of file
+            handle_stage_failure(db, rid, stage, e)
+            raise
+
+def handle_stage_failure(db, rid: int, stage: str, e: Exception):
+    """Logs a failed stage, and marks the report as errored if RQ won't retry it."""
+    if not is_last_attempt():
+        logger.warning(f"Failed to process report ID: {rid} ({stage}), will be retried. Error: {str(e)}")
+        return
+
+    logger.exception(f"Failed to process report ID: {rid} ({stage}). Error: {str(e)}")
+
+    # error marking gets its own try so a broken DB doesn't hide the original error
+    try:
+        Reports.mark_error(db=db, errormsg=str(e), id=rid)
+        clear_stage_results(rid)
+    except Exception as inner_e:
+        logger.error(f"FATAL: Could not mark report {rid} as error. Database issue: {inner_e}")
+
+def ocr_pages(db, rid: int):
+    report_medias = get_report_medias(db, rid)
+
+    if not report_medias or len(report_medias) == 0:
+        raise RuntimeError("Report has no media to extract")
+
+    return extract_report_pages({rid: report_medias})[rid]
+
+def extract_structured(rid: int, pages: list[str]):
+    raw_text = "\n".join(pages)
+
+    llm = llm_class(report_data=raw_text,prompt=get_extraction_prompt())
+    llm.set_report_id(rid)
+    cleaned_report = llm.call_llm()
+
+    if cleaned_report is None:
+        raise RuntimeError("LLM returned no structured data")
+
+    logger.debug(f"Report id -> {rid}. Extracted {len(raw_text)} characters of OCR text")
+    return raw_text, cleaned_report
+
+def persist_structured(db, report, raw_text: str, cleaned_report: dict):
+    rid = report.id
+    # one transaction for every extracted entity + the completed flag
+    data_to_vectorize = persist_report_entities(db=db, report_id=rid, cleaned_report=cleaned_report, raw_text=raw_text)
+    
+    # # for collection1
+    raw_report_vectorize = {
+        "report_id":rid,
+        "patient_id":report.patient_id,
+        # owner of the patient, goes into every point's payload for the user_id filter/tenant index
+        "user_id":report.patient.creator_id,
+        "data":data_to_vectorize
+    }
+
+    # saved before the commit, if enqueueing below fails the retry finds it (see resume_vectorization)
+    save_stage_result(rid, "persist", raw_report_vectorize)
+    Reports.mark_completed(db=db,id=rid)
+    # answers given for an earlier extraction of this report are stale now
+    answer_cache.invalidate(rid)
+    logger.info(f"Report id -> {rid}. Processed Successfully")
+    enqueue_vectorization(rid, raw_report_vectorize)
+
+def ocr_report(rid: int):
+    """report_ocr stage (CPU bound): preprocessing + OCR of every page."""
+    def stage(db, rid):
+        if not Reports.get_report(db=db, id=rid):
+            return
+        save_stage_result(rid, "ocr", ocr_pages(db, rid))
+        _enqueue_stage(extract_queue, extract_report, rid, "extract")
+    return run_stage(rid, "ocr", stage)
+
+def extract_report(rid: int):
+    """report_extract stage (network bound): LLM extraction of the OCR text."""
+    def stage(db, rid):
+        if not Reports.get_report(db=db, id=rid):
+            return
+        # ends the transaction so the connection goes back to the pool while the LLM runs
+        db.rollback()
+        raw_text, cleaned_report = extract_structured(rid, load_stage_result(rid, "ocr"))
+        save_stage_result(rid, "extract", {"raw_text": raw_text, "cleaned_report": cleaned_report})
+        _enqueue_stage(persist_queue, persist_report, rid, "persist")
+    return run_stage(rid, "extract", stage)
+
+def persist_report(rid: int):
+    """report_persist stage: writes the extracted entities and hands the report to vectorization."""
+    def stage(db, rid):
+        report = Reports.get_report(db=db, id=rid)
+        if not report:
+            resume_vectorization(db, rid)
+            return
+        extracted = load_stage_result(rid, "extract")
+        persist_structured(db, report, extracted["raw_text"], extracted["cleaned_report"])
+        clear_stage_results(rid)
+    return run_stage(rid, "persist", stage)
+
+def process_report(rid: int):
+    """Every stage of one report in a single job, for report:<id> jobs enqueued before the pipeline was split."""
+    def stage(db, rid):
+        report = Reports.get_report(db=db, id=rid)
+        if not report:
+            resume_vectorization(db, rid)
+            return
+        raw_text, cleaned_report = extract_structured(rid, ocr_pages(db, rid))
+        persist_structured(db, report, raw_text, cleaned_report)
+        clear_stage_results(rid)
+    return run_stage(rid, "all", stage)
+
+def process_reports(report_ids: list[int]):
+    """For process_reports batch jobs enqueued before the scheduler switched to enqueue_report."""
+    return [enqueue_report(rid).id for rid in report_ids]
\ No newline at end of file
@@ -1,15 +1,30 @@
-import multiprocessing
-import subprocess
+import argparse
 
-def start_worker(name):
-    subprocess.run(["rq", "worker", name])
+# worker processes per queue, override with --concurrency queue=N
+DEFAULT_CONCURRENCY = {
+    "email_worker": 1,
+    "raw_data_vectorization": 1,
+    "report_tasks": 1,
+    "report_ocr": 1,        # CPU bound, at most one per core
+    "report_extract": 4,    # waits on the LLM API, cheap to run many
+    "report_persist": 1,
+}
+
+def parse_concurrency(values):
+    concurrency = dict(DEFAULT_CONCURRENCY)
+    for value in values or []:
+        name, _, count = value.partition("=")
+        if name not in concurrency or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"expected one of {', '.join(concurrency)} as queue=N, got {value!r}")
+        concurrency[name] = int(count)
+    return concurrency
 
 if __name__ == "__main__":
-    worker_names = ["email_worker", "raw_data_vectorization",'report_tasks']
-    procs = []
-    for name in worker_names:
-        p = multiprocessing.Process(target=start_worker, args=(name,))
-        p.start()
-        procs.append(p)
-    for p in procs:
-        p.join()
+    parser = argparse.ArgumentParser(description="Start the RQ workers for every queue")
+    parser.add_argument("--concurrency", action="append", metavar="QUEUE=N", help="worker processes for a queue, repeatable")
+    args = parser.parse_args()
+    concurrency = parse_concurrency(args.concurrency)
+
+    # imported after parsing, it sets the thread env vars before any model library is loaded
+    from app.workers.prefork import PreforkSupervisor
+    PreforkSupervisor(concurrency).run()
@@ -1,5 +1,6 @@
-from app.lib import dense_embedder,client,sparse_embedder
+from app.lib import get_dense_embedder,get_qdrant,get_sparse_embedder
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from app.lib.constants import EMBED_BATCH_SIZE, QDRANT_STORE_ROW_PAYLOAD
 
 def clean_report(data):
     """Recursively drop None, empty strings, empty lists/dicts."""
@@ -25,16 +26,16 @@ def flatten_recursive(data, parent_key=""):
         items.append(f"{parent_key}: {str(data)}")
     return [str(x) for x in items]
 
-def vectorize_raw_report_data(report_data):
+def collect_report_chunks(report_data_list):
     """
-    Process each item in the report_data_list, clean, flatten, split into chunks, 
-    embed each chunk, and store embeddings in Qdrant with proper metadata.
+    Cleans, flattens and splits every collection entry of a report.
+    Returns (collection_id, collection_name, chunk_id, text) tuples in report order.
     """
-    report_id = report_data.get("report_id",None)
-    user_id = report_data.get("user_id",None)
-    print(report_id,user_id)
-
-    report_data_list = report_data.get("data",[])
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,   # max 500 chars per chunk
+        chunk_overlap=50  # 50 chars overlap between chunks
+    )
+    chunks = []
     for report_dict in report_data_list:
         collection_id = report_dict.get("collection_id")
         collection_name = report_dict.get("name")
@@ -45,25 +46,50 @@ def vectorize_raw_report_data(report_data):
         flat_text = " | ".join(flatten_recursive(cleaned))
 
         # 2. Split into chunks with overlap
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,   # max 500 chars per chunk
-            chunk_overlap=50  # 50 chars overlap between chunks
-        )
-        chunks = text_splitter.split_text(flat_text)
+        for idx, chunk in enumerate(text_splitter.split_text(flat_text)):
+            chunks.append((collection_id, collection_name, idx, chunk))
+    return chunks
+
+def embed_chunks(texts, batch_size=EMBED_BATCH_SIZE):
+    """Embeds all texts with both models, batch_size texts per ONNX run. Output order matches `texts`."""
+    dense = list(get_dense_embedder().embed(texts, batch_size=batch_size))
+    sparse = list(get_sparse_embedder().embed(texts, batch_size=batch_size))
+    return dense, sparse
+
+def vectorize_raw_report_data(report_data):
+    """
+    Clean, flatten and split every item in the report's data list, embed all chunks
+    in batches, and store the embeddings in Qdrant with proper metadata.
+    """
+    report_id = report_data.get("report_id",None)
+    user_id = report_data.get("user_id",None)
+    print(report_id,user_id)
+
+    report_data_list = report_data.get("data",[])
+    chunks = collect_report_chunks(report_data_list)
+    if not chunks:
+        return
 
-        # 3. Embed each chunk and store
-        for idx, chunk in enumerate(chunks):
-            dense_embeddings = list(dense_embedder.embed(chunk))[0]
-            sparse_embeddings = list(sparse_embedder.embed(chunk))[0]
-            client.insert_raw_report_embedding(
-                dense_embeddings=dense_embeddings,
-                sparse_embeddings=sparse_embeddings,
-                chunk_id=idx,
-                report_id=report_id,
-                user_id=user_id,
-                collection_id=collection_id,
-                collection_name=collection_name
-            )
+    rows = {}
+    if QDRANT_STORE_ROW_PAYLOAD:
+        rows = {(d.get("name"), d.get("collection_id")): d.get("data") for d in report_data_list}
 
-        print(f"Inserted {len(chunks)} embeddings for report {report_id} in collection {collection_id}")
+    # 3. Embed every chunk of the report at once and store
+    dense_embeddings, sparse_embeddings = embed_chunks([text for _, _, _, text in chunks])
+    client = get_qdrant()
+    points = [
+        client.build_point(
+            dense_embeddings=dense,
+            sparse_embeddings=sparse,
+            chunk_id=idx,
+            report_id=report_id,
+            user_id=user_id,
+            collection_id=collection_id,
+            collection_name=collection_name,
+            row=rows.get((collection_name, collection_id))
+        )
+        for (collection_id, collection_name, idx, _), dense, sparse in zip(chunks, dense_embeddings, sparse_embeddings)
+    ]
+    inserted = client.upsert_points(points)
 
+    print(f"Inserted {inserted} embeddings for report {report_id}")
@@ -0,0 +1,55 @@
+"""
+Requests/sec and p50/p95 latency of the async report routes under increasing concurrency,
+against a running API. Run it once on the sync-session build and once on this one to see
+what moving the routes off the event loop buys.
+
+    python benchmarks/api_load.py <access_token> <patient_id> <report_id> [requests_per_level] [levels]
+
+levels defaults to 1,8,32,64 concurrent clients. BASE_URL (from .env) is used as the API address.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:5000/")
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def run_level(token, paths, concurrency, total):
+    def call(i):
+        session = requests.Session()
+        session.cookies.set("access_token", token)
+        start = time.perf_counter()
+        resp = session.get(BASE_URL + paths[i % len(paths)], timeout=60)
+        return time.perf_counter() - start, resp.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, status in results if status >= 500)
+    return total / elapsed, percentile(latencies, 50), percentile(latencies, 95), errors
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        raise SystemExit(__doc__)
+    token, patient_id, report_id = sys.argv[1:4]
+    total = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+    levels = [int(l) for l in sys.argv[5].split(",")] if len(sys.argv) > 5 else [1, 8, 32, 64]
+    paths = [
+        f"report/{report_id}/{patient_id}",
+        f"report/aisummary/{report_id}/{patient_id}",
+    ]
+
+    for concurrency in levels:
+        rps, p50, p95, errors = run_level(token, paths, concurrency, total)
+        print(f"concurrency={concurrency} rps={rps:.1f} p50={p50*1000:.0f}ms p95={p95*1000:.0f}ms 5xx={errors}")
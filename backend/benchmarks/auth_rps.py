@@ -0,0 +1,50 @@
+"""
+Requests/sec on GET /patients/ against a running API, to compare the auth principal cache.
+Start the API once with AUTH_CACHE_ENABLED=false and once with it on (the default) and
+run this against both.
+
+    python benchmarks/auth_rps.py <access_token> [requests] [concurrency]
+
+BASE_URL (from .env) is used as the API address.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.api_load import percentile
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:5000/")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    token = sys.argv[1]
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    local = threading.local()
+
+    def call(_):
+        # one keep-alive session per client thread, so connection setup isn't measured
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.cookies.set("access_token", token)
+        start = time.perf_counter()
+        resp = local.session.get(BASE_URL + "patients/", timeout=30)
+        return time.perf_counter() - start, resp.status_code
+
+    call(None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in results]
+    failed = sum(1 for _, status in results if status != 200)
+    print(f"requests={total} concurrency={concurrency} rps={total/elapsed:.1f} "
+          f"p50={percentile(latencies, 50)*1000:.1f}ms p95={percentile(latencies, 95)*1000:.1f}ms non_200={failed}")
@@ -0,0 +1,85 @@
+"""
+Persists a synthetic report with 200 test results against the Postgres in DB_URL,
+once with the per-row create() classmethods and once with persist_report_entities.
+Creates (and removes afterwards) a throwaway user, patient and reports.
+
+    python benchmarks/bulk_persist.py [tests]
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import time
+import uuid
+from datetime import date
+from app.db import SessionLocal, Base, engine, apply_migrations
+from app.models import User, Patient, Reports, TestResults, ReportMetaData, SpecimenValidity
+from app.models.User import GenderEnum
+from app.workers.persistence import (
+    persist_report_entities, metadata_rows, specimen_validity_rows, test_result_rows,
+)
+
+def synthetic_report(tests: int):
+    return {
+        "report_metadata": {"report_type": "Blood Test", "lab_name": "Benchmark Labs", "collection_date": "2024-01-15"},
+        "specimen_validity": {"ph": {"value": "6.5", "status": "Normal"}, "overall_validity": True},
+        "test_results": [
+            {
+                "test_name": f"Test {i}", "test_category": "Chemistry", "outcome": "normal",
+                "result_value": str(i), "unit": "mg/dL", "reference_range": "0-300",
+                "is_abnormal": False, "is_critical": False,
+            }
+            for i in range(tests)
+        ],
+        "screening_tests": [],
+        "confirmation_analysis": [],
+        "reported_medications": [],
+    }
+
+def per_row(db, report_id, cleaned_report):
+    for row in metadata_rows(report_id, cleaned_report["report_metadata"], "raw text"):
+        ReportMetaData.create(session=db, **row)
+    for row in specimen_validity_rows(report_id, cleaned_report["specimen_validity"]):
+        SpecimenValidity.create(session=db, **row)
+    for row in test_result_rows(report_id, cleaned_report["test_results"]):
+        TestResults.create(session=db, **row)
+
+def bulk(db, report_id, cleaned_report):
+    persist_report_entities(db=db, report_id=report_id, cleaned_report=cleaned_report, raw_text="raw text")
+    db.commit()
+
+if __name__ == "__main__":
+    tests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cleaned_report = synthetic_report(tests)
+    Base.metadata.create_all(engine)
+    apply_migrations(engine)
+
+    with SessionLocal() as db:
+        suffix = uuid.uuid4().hex[:8]
+        user = User(
+            first_name="Bench", last_name="Mark", email=f"bench-{suffix}@example.com",
+            password="x", phone_number=suffix[:10], gender=GenderEnum.MALE,
+        )
+        db.add(user)
+        db.flush()
+        patient = Patient(first_name="Bench", last_name="Mark", dob=date(1990, 1, 1), gender=GenderEnum.MALE, creator_id=user.id)
+        db.add(patient)
+        db.flush()
+        reports = [Reports(patient_id=patient.id) for _ in range(2)]
+        db.add_all(reports)
+        db.commit()
+
+        try:
+            for label, fn, report in (("per-row", per_row, reports[0]), ("bulk", bulk, reports[1])):
+                start = time.perf_counter()
+                fn(db, report.id, cleaned_report)
+                elapsed = time.perf_counter() - start
+                print(f"{label:<8} tests={tests} time={elapsed*1000:.1f}ms")
+        finally:
+            db.rollback()
+            for report in reports:
+                db.delete(report)
+            db.delete(patient)
+            db.delete(user)
+            db.commit()
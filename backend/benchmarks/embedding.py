@@ -0,0 +1,50 @@
+"""
+Chunks/sec for per-chunk embedding (old behaviour) vs batched embedding, using the
+local fastembed ONNX models (dense bge-small-en-v1.5 + sparse bm42).
+
+    python benchmarks/embedding.py [chunks] [batch_size]
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import time
+from app.lib import get_dense_embedder, get_sparse_embedder
+from app.workers.vector_db_workers import collect_report_chunks, embed_chunks
+
+def synthetic_report(tests: int):
+    return [
+        {
+            "collection_id": i,
+            "name": "test_results",
+            "data": {
+                "test_name": f"Test {i}", "test_category": "Chemistry", "outcome": "normal",
+                "result_value": str(i), "unit": "mg/dL", "reference_range": "0-300",
+                "is_abnormal": False, "is_critical": False,
+            },
+        }
+        for i in range(tests)
+    ]
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    texts = [text for _, _, _, text in collect_report_chunks(synthetic_report(count))]
+
+    # load both ONNX sessions before timing
+    embed_chunks(texts[:1])
+
+    dense_embedder, sparse_embedder = get_dense_embedder(), get_sparse_embedder()
+    start = time.perf_counter()
+    for text in texts:
+        list(dense_embedder.embed(text))[0]
+        list(sparse_embedder.embed(text))[0]
+    per_chunk = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embed_chunks(texts, batch_size=batch_size)
+    batched = time.perf_counter() - start
+
+    print(f"per-chunk chunks={len(texts)} chunks/sec={len(texts)/per_chunk:.1f}")
+    print(f"batched   chunks={len(texts)} batch_size={batch_size} chunks/sec={len(texts)/batched:.1f}")
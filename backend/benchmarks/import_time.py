@@ -0,0 +1,52 @@
+"""
+Import-time budget for the API process. Runs `python -X importtime -c "import main"` and fails
+(exit code 1) when the cumulative import time of main.py goes over IMPORT_TIME_BUDGET_MS, or when
+a module that only workers need (paddle, fastembed, onnxruntime, sympy) gets imported. qdrant_client
+is on the list too: importing it imports fastembed and onnxruntime.
+Needs the same environment as the API (main.py creates the tables on import).
+
+    python benchmarks/import_time.py [budget_ms]
+"""
+import os, sys
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN = ("paddleocr", "paddle", "fastembed", "onnxruntime", "sympy", "qdrant_client")
+
+def parse_importtime(stderr: str):
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+if __name__ == "__main__":
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else float(os.getenv("IMPORT_TIME_BUDGET_MS", "4000"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit("import main failed")
+
+    modules = parse_importtime(proc.stderr)
+    total_ms = modules["main"][1] / 1000
+
+    print("slowest imports (cumulative):")
+    for name, (_, cumulative) in sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:15]:
+        print(f"  {cumulative/1000:>9.1f}ms  {name}")
+
+    failures = []
+    loaded = sorted(name for name in modules if name.split(".")[0] in FORBIDDEN)
+    if loaded:
+        failures.append(f"worker-only modules imported: {', '.join(loaded[:10])}")
+    if total_ms > budget_ms:
+        failures.append(f"main.py import took {total_ms:.0f}ms, budget is {budget_ms:.0f}ms")
+
+    print(f"main.py import: {total_ms:.0f}ms (budget {budget_ms:.0f}ms)")
+    if failures:
+        print("\n".join(failures))
+        raise SystemExit(1)
@@ -0,0 +1,65 @@
+"""
+Fires a burst of POST /auth/signin at a running API and reports throughput, latency and how
+many requests were turned away by the rate limiter (429) or the password hashing pool (503).
+While it runs, GET /patients/ is timed on the side to show whether other routes stay
+responsive while bcrypt is busy.
+
+    python benchmarks/login_burst.py <email> <password> [requests] [concurrency] [access_token]
+
+Use a wrong password to measure failed logins. Raise AUTH_RATE_LIMIT_PER_IP/PER_EMAIL on the
+API first to measure the hashing pool alone. BASE_URL (from .env) is used as the API address.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import threading
+import time
+import requests
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.api_load import percentile
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:5000/")
+
+def probe(token, stop, latencies):
+    session = requests.Session()
+    session.cookies.set("access_token", token)
+    while not stop.is_set():
+        start = time.perf_counter()
+        session.get(BASE_URL + "patients/", timeout=60)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.1)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        raise SystemExit(__doc__)
+    email, password = sys.argv[1:3]
+    total = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 32
+    token = sys.argv[5] if len(sys.argv) > 5 else None
+
+    def call(_):
+        start = time.perf_counter()
+        resp = requests.post(BASE_URL + "auth/signin", json={"email": email, "password": password}, timeout=60)
+        return time.perf_counter() - start, resp.status_code
+
+    stop = threading.Event()
+    probe_latencies = []
+    if token:
+        threading.Thread(target=probe, args=(token, stop, probe_latencies), daemon=True).start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    latencies = [latency for latency, _ in results]
+    statuses = Counter(status for _, status in results)
+    print(f"requests={total} concurrency={concurrency} rps={total / elapsed:.1f}")
+    print(f"signin p50={percentile(latencies, 50)*1000:.0f}ms p95={percentile(latencies, 95)*1000:.0f}ms")
+    print("status " + " ".join(f"{status}={count}" for status, count in sorted(statuses.items())))
+    if probe_latencies:
+        print(f"patients p50={percentile(probe_latencies, 50)*1000:.0f}ms p95={percentile(probe_latencies, 95)*1000:.0f}ms during the burst")
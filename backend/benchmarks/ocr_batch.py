@@ -0,0 +1,37 @@
+"""
+Pages/sec for page-by-page OCR vs batched predict calls, on a 10-page upload.
+
+    python benchmarks/ocr_batch.py [image_dir] [pages] [batch_size]
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import itertools
+import time
+from app.ocr.engine_pool import OCREnginePool
+from app.ocr.extraction import text_extraction, batch_text_extraction
+from benchmarks.ocr_pool import DEFAULT_IMAGE_DIR, load_samples
+
+if __name__ == "__main__":
+    image_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_IMAGE_DIR
+    page_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else page_count
+    pages = list(itertools.islice(itertools.cycle(load_samples(image_dir)), page_count))
+
+    pool = OCREnginePool(size=1)
+    pool.warm_up()
+
+    with pool.engine() as engine:
+        start = time.perf_counter()
+        sequential = [text_extraction(img=page, engine=engine) for page in pages]
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = batch_text_extraction(imgs=pages, batch_size=batch_size, engine=engine)
+        batched_time = time.perf_counter() - start
+
+    print(f"sequential pages={len(pages)} pages/sec={len(pages)/sequential_time:.2f}")
+    print(f"batched    pages={len(pages)} batch_size={batch_size} pages/sec={len(pages)/batched_time:.2f}")
+    print(f"page texts identical: {sequential == batched}")
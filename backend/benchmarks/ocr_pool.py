@@ -0,0 +1,65 @@
+"""
+Per-page OCR latency: a fresh PaddleOCR per page (old behaviour) vs the warm engine pool.
+
+    python benchmarks/ocr_pool.py [image_dir] [rounds]
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import glob
+import statistics
+import time
+from app.ocr.engine_pool import OCREnginePool, DEFAULT_CONFIG
+from app.ocr.extraction import text_extraction
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "ocr", "public", "processed")
+
+def load_samples(image_dir):
+    images = sorted(
+        p for ext in ("jpg", "jpeg", "png")
+        for p in glob.glob(os.path.join(image_dir, f"*.{ext}"))
+    )
+    if not images:
+        raise SystemExit(f"No sample images found in {image_dir}")
+    return images
+
+def summarize(label, timings):
+    print(
+        f"{label:<10} pages={len(timings):<4} "
+        f"mean={statistics.mean(timings)*1000:.1f}ms "
+        f"p50={statistics.median(timings)*1000:.1f}ms "
+        f"max={max(timings)*1000:.1f}ms"
+    )
+
+def bench_cold(images, rounds):
+    timings = []
+    for _ in range(rounds):
+        for img in images:
+            pool = OCREnginePool(size=1)
+            start = time.perf_counter()
+            with pool.engine() as engine:
+                text_extraction(img=img, engine=engine)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+def bench_pooled(images, rounds):
+    pool = OCREnginePool(size=1)
+    pool.warm_up(DEFAULT_CONFIG)
+    timings = []
+    for _ in range(rounds):
+        for img in images:
+            start = time.perf_counter()
+            with pool.engine() as engine:
+                text_extraction(img=img, engine=engine)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+if __name__ == "__main__":
+    image_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_IMAGE_DIR
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    images = load_samples(image_dir)
+
+    summarize("before", bench_cold(images, rounds))
+    summarize("after", bench_pooled(images, rounds))
@@ -0,0 +1,56 @@
+"""
+Wall time and OCR text agreement for each preprocessing profile over a corpus of lab reports.
+Agreement is measured against the text produced with the "full" profile (the previous behaviour).
+
+    python benchmarks/preprocess_profiles.py [image_dir]
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import statistics
+import time
+from difflib import SequenceMatcher
+from app.ocr.engine_pool import OCREnginePool
+from app.ocr.extraction import text_extraction
+from app.ocr.preprocess import preprocess_page
+from benchmarks.ocr_pool import DEFAULT_IMAGE_DIR, load_samples
+
+PROFILES = ("full", "fast", "skip", "auto")
+
+if __name__ == "__main__":
+    image_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_IMAGE_DIR
+    images = load_samples(image_dir)
+
+    pool = OCREnginePool(size=1)
+    pool.warm_up()
+
+    results = {profile: {"preprocess": [], "total": [], "agreement": [], "chosen": []} for profile in PROFILES}
+    with pool.engine() as engine:
+        for img_src in images:
+            reference = None
+            for profile in PROFILES:
+                start = time.perf_counter()
+                page, stats = preprocess_page(img_src=img_src, profile=profile, in_memory=True, debug=False)
+                preprocess_time = time.perf_counter() - start
+                text = text_extraction(img=page, engine=engine)
+                total_time = time.perf_counter() - start
+
+                if reference is None:
+                    reference = text
+                row = results[profile]
+                row["preprocess"].append(preprocess_time)
+                row["total"].append(total_time)
+                row["agreement"].append(SequenceMatcher(None, reference, text).ratio())
+                row["chosen"].append(stats["profile"])
+
+    print(f"{'profile':<8} {'preprocess':>12} {'preprocess+ocr':>16} {'agreement':>10}")
+    for profile, row in results.items():
+        print(
+            f"{profile:<8} "
+            f"{statistics.mean(row['preprocess'])*1000:>10.1f}ms "
+            f"{statistics.mean(row['total'])*1000:>14.1f}ms "
+            f"{statistics.mean(row['agreement']):>10.3f}"
+        )
+    print("auto picked:", ", ".join(results["auto"]["chosen"]))
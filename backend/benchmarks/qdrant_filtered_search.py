@@ -0,0 +1,104 @@
+"""
+Filtered search latency (p50/p95) on synthetic points in a local Qdrant, for three layouts:
+no payload index, keyword indexes (app.lib.qdrant_schema) and tenant mode.
+Each layout gets its own throwaway collection, dropped at the end.
+
+    python benchmarks/qdrant_filtered_search.py [sizes] [queries]
+
+sizes defaults to 10000,100000,1000000. QDRANT_HOST/QDRANT_PORT come from .env.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import time
+import numpy as np
+from qdrant_client import QdrantClient, models
+from app.lib.constants import QDRANT_HOST, QDRANT_PORT
+from app.lib.qdrant_schema import vectors_config, sparse_vectors_config, hnsw_config, KEYWORD_FIELDS, payload_index_schema, DENSE_SIZE
+
+CHUNKS_PER_REPORT = 50
+REPORTS_PER_USER = 20
+UPLOAD_BATCH = 1024
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def create(client, name, layout):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    tenant = layout == "tenant"
+    client.create_collection(
+        collection_name=name,
+        vectors_config=vectors_config(),
+        sparse_vectors_config=sparse_vectors_config(),
+        hnsw_config=hnsw_config(tenant),
+    )
+    if layout != "none":
+        for field in KEYWORD_FIELDS:
+            client.create_payload_index(collection_name=name, field_name=field, field_schema=payload_index_schema(field, tenant), wait=True)
+
+def fill(client, name, size, rng):
+    for start in range(0, size, UPLOAD_BATCH):
+        ids = range(start, min(size, start + UPLOAD_BATCH))
+        dense = rng.standard_normal((len(ids), DENSE_SIZE), dtype=np.float32)
+        points = []
+        for i, vector in zip(ids, dense):
+            report_id = i // CHUNKS_PER_REPORT
+            indices = rng.choice(30000, size=12, replace=False)
+            points.append(models.PointStruct(
+                id=i,
+                vector={
+                    "dense_vector": vector.tolist(),
+                    "sparse_vector": models.SparseVector(indices=indices.tolist(), values=rng.random(12).tolist()),
+                },
+                payload={
+                    "report_id": str(report_id),
+                    "user_id": str(report_id // REPORTS_PER_USER),
+                    "collection_name": "test_results",
+                },
+            ))
+        client.upsert(collection_name=name, points=points, wait=False)
+    # wait for indexing to finish so the numbers are about search, not the optimizer
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+def search(client, name, size, queries, rng):
+    reports = max(1, size // CHUNKS_PER_REPORT)
+    latencies = []
+    for _ in range(queries):
+        report_id = int(rng.integers(reports))
+        dense = rng.standard_normal(DENSE_SIZE, dtype=np.float32).tolist()
+        start = time.perf_counter()
+        client.query_points(
+            collection_name=name,
+            prefetch=[
+                models.Prefetch(query=models.SparseVector(indices=[1, 2, 3], values=[1.0, 1.0, 1.0]), using="sparse_vector", limit=20),
+                models.Prefetch(query=dense, using="dense_vector", limit=20),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=10,
+            query_filter=models.Filter(must=[
+                models.FieldCondition(key="report_id", match=models.MatchValue(value=str(report_id))),
+                models.FieldCondition(key="user_id", match=models.MatchValue(value=str(report_id // REPORTS_PER_USER))),
+            ]),
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10_000, 100_000, 1_000_000]
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT, timeout=300)
+    rng = np.random.default_rng(0)
+
+    for size in sizes:
+        for layout in ("none", "keyword", "tenant"):
+            name = f"bench_filtered_{layout}_{size}"
+            create(client, name, layout)
+            fill(client, name, size, rng)
+            latencies = search(client, name, size, queries, rng)
+            print(f"points={size} layout={layout} p50_ms={percentile(latencies, 50):.2f} p95_ms={percentile(latencies, 95):.2f}")
+            client.delete_collection(name)
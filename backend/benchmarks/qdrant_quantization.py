@@ -0,0 +1,95 @@
+"""
+Recall@10, search latency and dense vector RAM for each quantization / on-disk layout from
+app.lib.qdrant_schema, on a synthetic corpus in a local Qdrant.
+Recall is measured against exact (brute force) search on the unquantized collection.
+
+    python benchmarks/qdrant_quantization.py [points] [queries]
+
+QDRANT_HOST/QDRANT_PORT come from .env. Every collection is dropped at the end.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import time
+import numpy as np
+from qdrant_client import QdrantClient, models
+from app.lib.constants import QDRANT_HOST, QDRANT_PORT, QDRANT_QUANTIZATION_OVERSAMPLING
+from app.lib.qdrant_schema import create_collection, search_params, DENSE_SIZE
+
+LAYOUTS = [
+    ("none", False),
+    ("scalar", False),
+    ("binary", False),
+    ("scalar", True),
+    ("binary", True),
+]
+UPLOAD_BATCH = 1024
+TOP_K = 10
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def synthetic_corpus(count, rng, clusters=256):
+    # clustered unit vectors, closer to real chunk embeddings than uniform noise
+    centers = rng.standard_normal((clusters, DENSE_SIZE), dtype=np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.35 * rng.standard_normal((count, DENSE_SIZE), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def vector_ram_mb(count, quantization, on_disk):
+    """Dense vector memory Qdrant keeps in RAM: quantized vectors always, originals unless on disk."""
+    original = 0 if on_disk else count * DENSE_SIZE * 4
+    quantized = {"none": 0, "scalar": count * DENSE_SIZE, "binary": count * DENSE_SIZE // 8}[quantization]
+    return (original + quantized) / 1024 / 1024
+
+def fill(client, name, vectors):
+    for start in range(0, len(vectors), UPLOAD_BATCH):
+        batch = vectors[start:start + UPLOAD_BATCH]
+        client.upsert(
+            collection_name=name,
+            points=[
+                models.PointStruct(id=start + i, vector={"dense_vector": v.tolist()}, payload={"report_id": str((start + i) // 50)})
+                for i, v in enumerate(batch)
+            ],
+            wait=False,
+        )
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+def search(client, name, queries, params):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        res = client.query_points(collection_name=name, query=query.tolist(), using="dense_vector", limit=TOP_K, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({p.id for p in res.points})
+    return results, latencies
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT, timeout=300)
+    rng = np.random.default_rng(0)
+    vectors = synthetic_corpus(count, rng)
+    queries = synthetic_corpus(query_count, rng)
+
+    truth = None
+    for quantization, on_disk in LAYOUTS:
+        name = f"bench_quant_{quantization}_{'disk' if on_disk else 'ram'}"
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        create_collection(client, name, tenant_mode=False, quantization=quantization, on_disk=on_disk)
+        fill(client, name, vectors)
+
+        if truth is None:
+            truth, _ = search(client, name, queries, models.SearchParams(exact=True))
+        results, latencies = search(client, name, queries, search_params(quantization))
+        recall = np.mean([len(found & expected) / TOP_K for found, expected in zip(results, truth)])
+        print(
+            f"quantization={quantization} on_disk={on_disk} oversampling={QDRANT_QUANTIZATION_OVERSAMPLING} "
+            f"recall@{TOP_K}={recall:.4f} p50_ms={percentile(latencies, 50):.2f} p95_ms={percentile(latencies, 95):.2f} "
+            f"vector_ram_mb={vector_ram_mb(count, quantization, on_disk):.1f}"
+        )
+        client.delete_collection(name)
@@ -0,0 +1,52 @@
+"""
+p50/p95 time-to-first-token of /report/search against a running API.
+
+    python benchmarks/search_ttft.py <access_token> <patient_id> <report_id> [requests] [query]
+
+BASE_URL (from .env) is used as the API address.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import statistics
+import time
+import requests
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:5000/")
+
+def time_to_first_token(session, params):
+    start = time.perf_counter()
+    with session.get(BASE_URL + "report/search", params=params, stream=True, timeout=120) as resp:
+        resp.raise_for_status()
+        first = None
+        for line in resp.iter_lines():
+            if first is None and line.startswith(b"data:"):
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        raise SystemExit(__doc__)
+    token, patient_id, report_id = sys.argv[1:4]
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    query = sys.argv[5] if len(sys.argv) > 5 else "Is my cholesterol high?"
+
+    session = requests.Session()
+    session.cookies.set("access_token", token)
+    params = {"query": query, "patient_id": patient_id, "report_id": report_id}
+
+    ttfts, totals = [], []
+    for _ in range(count):
+        ttft, total = time_to_first_token(session, params)
+        if ttft is not None:
+            ttfts.append(ttft)
+        totals.append(total)
+
+    print(f"requests={count} ttft p50={percentile(ttfts, 50)*1000:.0f}ms p95={percentile(ttfts, 95)*1000:.0f}ms")
+    print(f"full answer p50={statistics.median(totals)*1000:.0f}ms")
@@ -0,0 +1,85 @@
+"""
+Checks that concurrent requests and jobs each get their own database connection.
+
+Opens N sessions at the same time through the same scopes the app uses (get_async_db,
+which upload_files depends on, get_db and job_session), holds them open together and asks
+Postgres for each one's backend pid. Exits non-zero if any two share a connection.
+The identity map stats of the scopes are printed at the end.
+
+    python benchmarks/session_concurrency.py [concurrency]
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import asyncio
+import threading
+from sqlalchemy import text
+from app.db import get_async_db, get_db, job_session, identity_map_stats
+
+BACKEND_PID = text("SELECT pg_backend_pid()")
+
+async def async_request_pids(concurrency):
+    all_open = asyncio.Event()
+    opened = []
+
+    async def request():
+        dependency = get_async_db()
+        db = await anext(dependency)
+        try:
+            pid = await db.scalar(BACKEND_PID)
+            # every session stays checked out until all of them have their pid
+            opened.append(pid)
+            if len(opened) == concurrency:
+                all_open.set()
+            await all_open.wait()
+            return pid
+        finally:
+            await dependency.aclose()
+
+    return await asyncio.gather(*[request() for _ in range(concurrency)])
+
+def threaded_pids(concurrency, open_session):
+    barrier = threading.Barrier(concurrency)
+    pids = []
+    lock = threading.Lock()
+
+    def run():
+        with open_session() as db:
+            pid = db.scalar(BACKEND_PID)
+            barrier.wait()
+        with lock:
+            pids.append(pid)
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return pids
+
+class request_session:
+    """get_db driven the way FastAPI drives a yield dependency."""
+    def __enter__(self):
+        self.dependency = get_db()
+        return next(self.dependency)
+
+    def __exit__(self, *exc):
+        self.dependency.close()
+
+def check(name, pids):
+    ok = len(set(pids)) == len(pids)
+    print(f"{name}: sessions={len(pids)} distinct_connections={len(set(pids))} {'OK' if ok else 'SHARED'}")
+    return ok
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    results = [
+        check("async request (upload_files)", asyncio.run(async_request_pids(concurrency))),
+        check("sync request", threaded_pids(concurrency, request_session)),
+        check("rq job", threaded_pids(concurrency, lambda: job_session("check"))),
+    ]
+    print(identity_map_stats())
+    if not all(results):
+        raise SystemExit(1)
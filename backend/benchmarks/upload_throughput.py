@@ -0,0 +1,53 @@
+"""
+Throughput of POST /report/upload with 10 files of 5 MB each against a running API.
+Every round uploads fresh random bytes. With --repeat the same bytes are uploaded every round,
+so from the second round on the files are linked to the patient's existing media instead of
+being stored again.
+
+    python benchmarks/upload_throughput.py <access_token> <patient_id> [rounds] [--repeat]
+
+Use a throwaway patient: every upload creates a report that the scheduler picks up, and the
+random bytes are not valid images. BASE_URL (from .env) is used as the API address.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+load_dotenv()
+
+import time
+import requests
+from benchmarks.api_load import percentile
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:5000/")
+FILES = 10
+FILE_BYTES = 5 * 1024 * 1024
+
+def random_files():
+    return [os.urandom(FILE_BYTES) for _ in range(FILES)]
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--repeat"]
+    if len(args) < 2:
+        raise SystemExit(__doc__)
+    token, patient_id = args[:2]
+    rounds = int(args[2]) if len(args) > 2 else 5
+    repeat = "--repeat" in sys.argv
+
+    session = requests.Session()
+    session.cookies.set("access_token", token)
+    payloads = random_files()
+    latencies = []
+    for i in range(rounds):
+        if i and not repeat:
+            payloads = random_files()
+        files = [("files", (f"page_{n}.png", data, "image/png")) for n, data in enumerate(payloads)]
+        start = time.perf_counter()
+        resp = session.post(BASE_URL + "report/upload", data={"patient_id": patient_id}, files=files, timeout=300)
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        mb = FILES * FILE_BYTES / (1024 * 1024)
+        print(f"round={i + 1} status={resp.status_code} {elapsed*1000:.0f}ms {mb / elapsed:.1f} MB/s")
+
+    total_mb = rounds * FILES * FILE_BYTES / (1024 * 1024)
+    print(f"{FILES}x{FILE_BYTES // (1024 * 1024)}MB rounds={rounds} repeat={repeat} "
+          f"avg={total_mb / sum(latencies):.1f} MB/s p50={percentile(latencies, 50)*1000:.0f}ms p95={percentile(latencies, 95)*1000:.0f}ms")
@@ -2,19 +2,31 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import uvicorn
-from app.db import Base,engine
+from app.db import Base,engine,apply_migrations
 from fastapi import FastAPI
 import app.models
 from app.lib.seed import seed_in
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.lib import UPLOADS_DIR
+from app.middleware import UploadSizeLimit
+from app.lib.password_hasher import password_hasher
+from contextlib import asynccontextmanager
 import os
 
-app=FastAPI()
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # runs before the first request is taken, see PasswordHasher.start
+    password_hasher.start()
+    yield
+    password_hasher.shutdown()
+
+app=FastAPI(lifespan=lifespan)
 
 origins=["http://localhost:5173"]
 
+# added first so CORS wraps it, its 413 responses need the CORS headers too
+app.add_middleware(UploadSizeLimit)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -25,6 +37,7 @@ app.add_middleware(
 
 # Base.metadata.drop_all(engine)
 Base.metadata.create_all(engine)
+apply_migrations(engine)
 
 os.makedirs(UPLOADS_DIR,exist_ok=True)
 app.mount("/uploads",StaticFiles(directory=UPLOADS_DIR), name="static")
@@ -36,6 +49,7 @@ from app.routers.user import router as user_routes
 from app.routers.chat import router as chat_routes
 from app.routers.patients import router as patient_routes
 from app.routers.trends import router as trends_routes
+from app.routers.pipeline import router as pipeline_routes
 
 app.include_router(router=report_routes)
 app.include_router(router=auth_routes)
@@ -43,6 +57,7 @@ app.include_router(router=user_routes)
 # app.include_router(router=chat_routes)
 app.include_router(router=patient_routes)
 app.include_router(router=trends_routes)
+app.include_router(router=pipeline_routes)
 
 if __name__ == "__main__":
     # import os
@@ -3,26 +3,28 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import time
 from app.models import Reports
-from app.db import SessionLocal
-from app.lib import client,get_logger
+from app.db import job_session
+from app.lib import get_qdrant,get_logger,answer_cache
 
-db=SessionLocal()
 logger = get_logger("delete_scheduler", "delete_scheduler.log")
 
 def delete_reports():
     try:
-        deleted_reports_id = (
-            db.query(Reports.id)
-            .filter(Reports.deleted==True)
-            .limit(35)
-            .all()
-        )
+        # a fresh session per run, an error can't leave a broken transaction for the next one
+        with job_session("delete_reports") as db:
+            deleted_reports_id = (
+                db.query(Reports.id)
+                .filter(Reports.deleted==True)
+                .limit(35)
+                .all()
+            )
 
-        report_ids = [r.id for r in deleted_reports_id]
-        if report_ids:
-            db.query(Reports).filter(Reports.id.in_(report_ids)).delete(synchronize_session=False)
-            client.delete_embeddings(report_ids=report_ids)
-            db.commit()
+            report_ids = [r.id for r in deleted_reports_id]
+            if report_ids:
+                db.query(Reports).filter(Reports.id.in_(report_ids)).delete(synchronize_session=False)
+                get_qdrant().delete_embeddings(report_ids=report_ids)
+                answer_cache.invalidate(report_ids)
+                db.commit()
         logger.info(", ".join(str(report_ids)) + " Submitted for deleted successfully")
     except Exception as e:
         logger.error(f"Error while deleting report {e}")
@@ -3,39 +3,77 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+import select
 import time
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from app.db import job_session, engine
 from app.models import Reports
-from app.lib import r_queue, get_logger
-from app.workers import process_reports
-
-BATCH_SIZE=10
+from app.lib import get_logger
+from app.lib.constants import REPORT_CLAIM_BATCH_SIZE, REPORT_NOTIFY_CHANNEL, REPORT_CLAIM_POLL_SECONDS
+from app.workers import enqueue_report
 
 logger = get_logger("enque_scheduler", "enqueue_scheduler.log")
 
 def enqueue_pending_reports():
+    """Claims and enqueues pending reports until none are left. Returns how many were enqueued."""
+    enqueued = 0
     try:
-        db:Session = SessionLocal()
-        pending = db.query(Reports).filter(Reports.data_extracted==False, Reports.enqueued==False).limit(BATCH_SIZE).all()
-
-        if not pending:
-            logger.info("Nothing to enqueue!!")
-            db.close()
-            return
-
-        report_ids = [r.id for r in pending]
-
-        for r in pending:
-            r.enqueued = True
-        db.commit()
-
-        r_queue.enqueue(process_reports, report_ids)
-        logger.info(", ".join(str(report_ids)) + " Submitted for processing")
+        with job_session("enqueue_reports") as db:
+            while True:
+                report_ids = Reports.claim_pending(db=db, limit=REPORT_CLAIM_BATCH_SIZE)
+                if not report_ids:
+                    break
+                pending = list(report_ids)
+                try:
+                    # one job per report, they spread over every report_tasks worker
+                    while pending:
+                        enqueue_report(pending[0])
+                        pending.pop(0)
+                except Exception:
+                    # otherwise they would stay enqueued=True with no job behind them
+                    Reports.release(db=db, ids=pending)
+                    raise
+                enqueued += len(report_ids)
+                logger.info(", ".join(str(report_ids)) + " Submitted for processing")
+                if len(report_ids) < REPORT_CLAIM_BATCH_SIZE:
+                    break
     except Exception as e:
-      logger.error(f'An exception occurred while enqueing {e}')
+        logger.error(f'An exception occurred while enqueing {e}')
+    return enqueued
+
+def listen_connection():
+    conn = engine.raw_connection()
+    pg = conn.driver_connection
+    pg.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    with pg.cursor() as cursor:
+        cursor.execute(f'LISTEN "{REPORT_NOTIFY_CHANNEL}"')
+    return conn, pg
 
 def scheduler_enqueue():
+    """
+    Waits on LISTEN for uploads and claims as soon as one is notified. Every
+    REPORT_CLAIM_POLL_SECONDS without a notification it claims anyway, which picks up
+    reports uploaded while no scheduler was listening. Safe to run several instances.
+    """
     while True:
-        enqueue_pending_reports()
-        time.sleep(5)
\ No newline at end of file
+        conn = None
+        try:
+            conn, pg = listen_connection()
+            logger.info(f"Listening on {REPORT_NOTIFY_CHANNEL}")
+            enqueue_pending_reports()
+            while True:
+                readable, _, _ = select.select([pg], [], [], REPORT_CLAIM_POLL_SECONDS)
+                if readable:
+                    pg.poll()
+                    # one claim round covers every notification received so far
+                    pg.notifies.clear()
+                enqueue_pending_reports()
+        except Exception as e:
+            logger.error(f"Lost the {REPORT_NOTIFY_CHANNEL} listener, reconnecting: {e}")
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                try:
+                    conn.invalidate()
+                except Exception:
+                    pass
\ No newline at end of file
@@ -1,11 +1,15 @@
 #!/bin/bash
 # start_workers.sh
+# one parent loads the models, then forks the workers of every queue (see app/workers/prefork.py)
+#   OCR_WORKERS (CPU bound), EXTRACT_WORKERS (LLM, network bound), PERSIST_WORKERS, VECTORIZE_WORKERS
 
-NUM_WORKERS=4
+OCR_WORKERS=${OCR_WORKERS:-2}
+EXTRACT_WORKERS=${EXTRACT_WORKERS:-4}
+PERSIST_WORKERS=${PERSIST_WORKERS:-1}
+VECTORIZE_WORKERS=${VECTORIZE_WORKERS:-1}
 
-for i in $(seq 1 $NUM_WORKERS); do
-    echo "Starting worker $i"
-    rq worker report_tasks 
-done
-
-wait
\ No newline at end of file
+exec python -m app.workers.start \
+    --concurrency report_ocr=$OCR_WORKERS \
+    --concurrency report_extract=$EXTRACT_WORKERS \
+    --concurrency report_persist=$PERSIST_WORKERS \
+    --concurrency raw_data_vectorization=$VECTORIZE_WORKERS
\ No newline at end of file